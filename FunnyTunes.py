@@ -1,39 +1,119 @@
 # For reading and writing database files
 import json
 import os
+import sys
+import hashlib
 import time
+import tempfile
+import struct
+import zlib
 import re as regex
+from datetime import date
 from shutil import rmtree
 from zipfile import ZipFile
 
+# Period-based listening statistics, searching and recommendations
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+import unicodedata
+
 # Interacting with LastFM's API
-import requests
 import webbrowser
 import threading
-from bs4 import BeautifulSoup
 
 # Encryption
-from backports.pbkdf2 import pbkdf2_hmac
-from base64 import urlsafe_b64encode
-from cryptography.fernet import Fernet, InvalidToken
+from hashlib import pbkdf2_hmac
+from base64 import urlsafe_b64encode, urlsafe_b64decode
 
 # GUI and image rendering
-from PIL import ImageTk, UnidentifiedImageError
-from PIL import Image as PILImage
+from collections import OrderedDict
 from tkinter import *
 from tkinter.filedialog import askopenfilename
 
 # LastFM API Key
 API_KEY = ''
 
+# Seconds to wait for a response before giving up, so one slow request can't hold up the others
+REQUEST_TIMEOUT = 10
+
+# Background enrichment sends one request at a time, at most one every this many seconds
+ENRICHMENT_INTERVAL = 1
+
+# Saving re-encrypts the whole database, so background enrichment saves its data at most once every this many seconds
+ENRICHMENT_SAVE_INTERVAL = 30
+
+# Listens less than this long are skips, and aren't saved in the database
+SKIP_MS = 30000
+
+# A gap of more than this many minutes between listens starts a new listening session
+SESSION_GAP = 30
+
+# Albums found by enrichment are searched one by one until this many are waiting, then joined into the search names
+SEARCH_MERGE_SIZE = 500
+
+# The encrypted listening database, databases saved before version 1 are JSON in ListeningDB.json
+DB_FILE = 'ListeningDB.bin'
+LEGACY_DB_FILE = 'ListeningDB.json'
+DB_MAGIC = b'FTDB'
+DB_VERSION = 1
+
+# The encrypted period rollups, saved in the same format as the database
+ROLLUPS_FILE = 'ListeningRollups.bin'
+
+# The encrypted listening analytics, saved in the same format as the database
+ANALYTICS_FILE = 'ListeningAnalytics.bin'
+
+# Requests, BeautifulSoup, cryptography and Pillow take a long time to import, so they are imported
+# inside the functions that use them. This lets the first window appear sooner, and preloadModules
+# imports them in the background once it is visible.
+
 # Declaring global variables
 listeningData = {}
+databaseLock = threading.Lock()
+listeningRollups = {}
+listeningAnalytics = {}
+searchIndex = None
+similarityGraph = None
+artworkStore = {'urls': {}, 'artists': {}}
+assetCache = {}
+placeholderCache = {}
+imageCache = OrderedDict()
+downloadingArtwork = {}
+artworkLock = threading.Lock()
+enrichmentState = {'position': 0, 'done': [], 'failed': [], 'attempts': {}, 'retryAfter': {}}
+enrichmentLock = threading.Lock()
+lastEnrichmentRequest = 0
+lastEnrichmentSave = 0
+enrichmentUnsaved = False
 downloadQueue = []
 topArtists = []
 topSongs = []
 dbKey = ''
 
 
+# Makes the background enrichment thread wait until the download queue is empty and ENRICHMENT_INTERVAL has passed
+# since its last request, so it never holds up what is on screen. Other threads don't wait.
+def waitForTurn():
+    global lastEnrichmentRequest
+
+    if threading.current_thread().name == 'Enrichment':
+        while downloadQueue or time.time() < lastEnrichmentRequest + ENRICHMENT_INTERVAL:
+            time.sleep(0.1)
+        lastEnrichmentRequest = time.time()
+
+
+# Sends a GET request, waiting for the enrichment thread's turn unless the caller has already waited
+def getRequest(url, params=None, waited=False):
+    import requests
+
+    if not waited:
+        waitForTurn()
+
+    return requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
+
+
 # Returns an artist's "tags" and similar artists
 def getArtistData(artistName):
     global listeningData
@@ -47,30 +127,52 @@ def getArtistData(artistName):
         'format': 'json'
     }
 
-    # Make GET request to API
-    response = requests.get('http://ws.audioscrobbler.com/2.0/', params=params)
+    # Only request what hasn't been saved yet, databases saved before similar artists had match weights
+    # already have the artist's tags
+    if 'tags' not in listeningData[artistName]:
+        # Make GET request to API
+        response = getRequest('http://ws.audioscrobbler.com/2.0/', params=params)
 
-    # If a response was returned (existence validation)
-    if response:
-        responseData = response.json()
-        artistTags = [tag['name'] for tag in responseData['artist']['tags']['tag'] if tag]
+        # LastFM responds with {"error": code, "message": text} when it can't find the artist
+        responseData = response.json() if response else {}
+        if 'artist' in responseData:
+            artistTags = [tag['name'] for tag in responseData['artist'].get('tags', {}).get('tag', []) if tag]
 
-        # The API doesn't always have data for related artists
-        if responseData['artist']['similar']['artist']:
-            similarArtists = [Artist['name'] for Artist in responseData['artist']['similar']['artist']]
-            listeningData[artistName]['similar'] = similarArtists[:3]
+            # Update existing database
+            with databaseLock:
+                listeningData[artistName]['tags'] = artistTags
 
-        # Update existing database
-        listeningData[artistName]['tags'] = artistTags
+    if 'similarMatch' not in listeningData[artistName]:
+        # artist.getInfo only includes a few similar artists and not how similar they are
+        # https://www.last.fm/api/show/artist.getSimilar
+        params['method'] = 'artist.getsimilar'
+        params['limit'] = '50'
+        response = getRequest('http://ws.audioscrobbler.com/2.0/', params=params)
 
+        responseData = response.json() if response else {}
+        if 'similarartists' in responseData:
+            # The API doesn't always have data for related artists, an empty list is saved so it isn't requested again
+            similarArtists = responseData['similarartists'].get('artist', [])
 
-# Retrieves an artist's profile image as a URL and passes it to the imageDL to be downloaded.
+            # Save every similar artist, they are shortened to fit the window when displayed
+            with databaseLock:
+                listeningData[artistName]['similar'] = [Artist['name'] for Artist in similarArtists]
+                listeningData[artistName]['similarMatch'] = [float(Artist['match']) for Artist in similarArtists]
+
+            # Add the artist to the recommendations graph
+            similarityGraph.addArtist(artistName, listeningData[artistName]['similar'],
+                                      listeningData[artistName]['similarMatch'])
+
+
+# Retrieves an artist's profile image as a URL and passes it to the artwork store to be downloaded.
 # Because of copyright, LastFM's API does not provide images so they need to be manually scraped from the website.
 # If an image is unavaliable either because of copyright or because the artist doesn't have an image,
 # A star will be displayed instead.
 def getArtistImage(artistName):
+    from bs4 import BeautifulSoup
+
     # Download the website's html
-    response = requests.get(f'https://www.last.fm/music/{artistName}')
+    response = getRequest(f'https://www.last.fm/music/{artistName}')
 
     # Parse html
     html = BeautifulSoup(response.text, 'html.parser')
@@ -78,27 +180,162 @@ def getArtistImage(artistName):
     # Find the artist's image URL in the page
     imageURL = html.find('meta', {'property': 'og:image'})['content']
 
-    # Download the image
-    imageDL(imageURL, artistName, artistName)
+    # Download the image and point the artist to it
+    fileName = storeArtwork(imageURL)
+    if fileName:
+        with artworkLock:
+            artworkStore['artists'][artistName] = fileName
+            saveArtworkStore()
+
+
+# Saves the artwork store's index of URLs and artists, replacing the old index in one step
+def saveArtworkStore():
+    with open('Images/Artwork.json.part', 'w', encoding='utf-8') as file:
+        json.dump(artworkStore, file, ensure_ascii=False)
+    os.replace('Images/Artwork.json.part', 'Images/Artwork.json')
+
+
+# Loads the artwork store's index if it exists
+def loadArtworkStore():
+    global artworkStore
+
+    if os.path.isfile('Images/Artwork.json'):
+        with open('Images/Artwork.json', encoding='utf-8') as file:
+            artworkStore = json.load(file)
+
+
+# Saves image data in the artwork store, named by the hash of its contents so identical images are only stored once.
+# The data is written to a temporary file and then renamed, so an image file is never partly written.
+# Each write has its own temporary file, as two URLs can have the same image and be downloaded at the same time.
+def writeArtwork(data, fileType):
+    fileName = f'{hashlib.sha256(data).hexdigest()}.{fileType}'
+
+    if not os.path.isfile(f'Images/Artwork/{fileName}'):
+        descriptor, tempPath = tempfile.mkstemp(suffix='.part', dir='Images/Artwork')
+        with os.fdopen(descriptor, 'wb') as image:
+            image.write(data)
+        os.replace(tempPath, f'Images/Artwork/{fileName}')
+
+    return fileName
+
+
+# Downloads an image from a URL into the artwork store and returns its file name.
+# Each URL is only downloaded once, if another thread is already downloading it then wait for that download instead.
+def storeArtwork(imageURL):
+    # LastFM uses a blank URL when there is no image
+    if not imageURL:
+        return
+
+    # Wait before claiming the download, as a foreground thread downloading the same image would wait for it
+    # while the download queue can't empty
+    waitForTurn()
+
+    with artworkLock:
+        # The image has already been downloaded
+        if imageURL in artworkStore['urls']:
+            return artworkStore['urls'][imageURL]
+
+        downloading = imageURL in downloadingArtwork
+        if not downloading:
+            downloadingArtwork[imageURL] = threading.Event()
+        finished = downloadingArtwork[imageURL]
+
+    # The other download gives up after REQUEST_TIMEOUT, this stops it being waited on forever if it doesn't
+    if downloading:
+        finished.wait(REQUEST_TIMEOUT * 3)
+        return artworkStore['urls'].get(imageURL)
+
+    try:
+        # The image's file type (.png, .jpg, .webp, etc...)
+        fileType = imageURL.rsplit('/', 1)[-1].rsplit('.', 1)[-1].lower()
+        if not fileType.isalnum() or len(fileType) > 4:
+            fileType = 'jpg'
+
+        response = getRequest(imageURL, waited=True)
+
+        # Error pages aren't images, the URL will be tried again next time it is needed
+        if not response.ok or not response.headers.get('Content-Type', '').startswith('image/'):
+            return
+
+        fileName = writeArtwork(response.content, fileType)
+
+        with artworkLock:
+            artworkStore['urls'][imageURL] = fileName
+            saveArtworkStore()
+
+        return fileName
+    finally:
+        # Wake any threads waiting for this download, even if it failed
+        with artworkLock:
+            del downloadingArtwork[imageURL]
+        finished.set()
+
+
+# The file path of an artist's image, or a blank string if it hasn't been downloaded
+def artistArtwork(artist):
+    fileName = artworkStore['artists'].get(artist)
+    return f'Images/Artwork/{fileName}' if fileName else ''
 
 
-# Downloads an image from a URL
-def imageDL(imageURL, artistName, fileName):
-    # The image's file type (.png, .jpg, .webp, etc...)
-    fileType = imageURL.rsplit('.', 1)[1]
+# The file path of a song's cover art, or a blank string if it hasn't been downloaded.
+# Singles don't have an album cover so they use the artist's image instead.
+def songArtwork(songInfo, song, artist):
+    if 'file' in songInfo:
+        return f'Images/Artwork/{songInfo["file"]}'
+    if songInfo.get('album') == song:
+        return artistArtwork(artist)
+    return ''
 
-    # Replace forbidden file characters with an underscore
-    safeArtistName = regex.sub(r'[\\/*?:"<>|.]', '_', artistName)
-    safeFileName = regex.sub(r'[\\/*?:"<>|.]', '_', fileName)
 
-    # If the folder where the image will be stored does not yet exist, create it
-    if not os.path.isdir(f'Images/Artists/{safeArtistName}'):
-        os.mkdir(f'Images/Artists/{safeArtistName}')
+# Whether an image file can be fully decoded, images from before the artwork store were written in place so an
+# interrupted download left a partly written file
+def isCompleteImage(imagePath):
+    from PIL import Image as PILImage
 
-    # Open file as bytes and write data
-    with open(f'Images/Artists/{safeArtistName}/{safeFileName}.{fileType}', 'wb') as image:
-        data = requests.get(imageURL).content
-        image.write(data)
+    try:
+        with PILImage.open(imagePath) as image:
+            image.load()
+    except (OSError, SyntaxError):
+        # Not an image, truncated or corrupted
+        return False
+    return True
+
+
+# Moves images saved in the old Images/Artists/{artist}/{album} layout into the artwork store
+def migrateArtwork():
+    for artist in listeningData:
+        # Replace forbidden file characters with an underscore
+        safeArtistName = regex.sub(r'[\\/*?:"<>.|]', '_', artist)
+        artistFolder = f'Images/Artists/{safeArtistName}'
+
+        if not os.path.isdir(artistFolder):
+            continue
+
+        # The artist's profile picture, incomplete pictures are left out to be downloaded again
+        if isCompleteImage(f'{artistFolder}/{safeArtistName}.jpg'):
+            with open(f'{artistFolder}/{safeArtistName}.jpg', 'rb') as image:
+                artworkStore['artists'][artist] = writeArtwork(image.read(), 'jpg')
+
+        for song, songInfo in listeningData[artist]['tracks'].items():
+            if 'file' not in songInfo:
+                continue
+
+            oldFile = songInfo.pop('file')
+
+            # Singles pointed to the artist's profile picture, which is now found through the artist instead
+            if songInfo.get('album') == song:
+                continue
+
+            # The download was interrupted, so remove the album as well for the song's info to be downloaded again
+            if not isCompleteImage(f'{artistFolder}/{oldFile}'):
+                songInfo.pop('album', None)
+                continue
+
+            with open(f'{artistFolder}/{oldFile}', 'rb') as image:
+                songInfo['file'] = writeArtwork(image.read(), oldFile.rsplit('.', 1)[-1])
+
+    saveArtworkStore()
+    rmtree('Images/Artists')
 
 
 # Retrieves a song's cover art and the album it's from if it is not a single
@@ -117,7 +354,7 @@ def getSongImage(songInfo):
     }
 
     # Make request and retrieve track data
-    response = requests.get('http://ws.audioscrobbler.com/2.0/', params=params)
+    response = getRequest('http://ws.audioscrobbler.com/2.0/', params=params)
     responseData = response.json()['track']
 
     # If the song is in an album and was not released as a single
@@ -126,41 +363,46 @@ def getSongImage(songInfo):
         albumTitle = responseData['title']
         imageURL = responseData['image'][2]['#text']
 
-        # Replace forbidden file characters with an underscore
-        safeAlbum = regex.sub(r'[\\/*?:"<>.|]', '_', albumTitle)
+        # Download the image, albums shared between artists are only downloaded once
+        fileName = storeArtwork(imageURL)
 
-        # The image's file type (.png, .jpg, .webp, etc...)
-        imageType = '.' + imageURL.rsplit('.', 1)[1]
+        # The image couldn't be downloaded, so leave the song's info to be downloaded again
+        if imageURL and not fileName:
+            return
 
         # Update listening database with the image's file name and the album the song is from
-        listeningData[artist]['tracks'][song]['file'] = safeAlbum + imageType
-        listeningData[artist]['tracks'][song]['album'] = albumTitle
+        with databaseLock:
+            if fileName:
+                listeningData[artist]['tracks'][song]['file'] = fileName
+            listeningData[artist]['tracks'][song]['album'] = albumTitle
 
-        # Download the image
-        imageDL(imageURL, artist, albumTitle)
+        # Make the album searchable
+        searchIndex.addAlbum(albumTitle, artist, song, listeningData[artist]['tracks'][song]['listens'])
     else:
-        # Replace forbidden file characters with an underscore
-        safeArtist = regex.sub(r'[\\/*?:"<>.|]', '_', artist)
-
-        # Update listening database with the image's file name and use the song's title as the "album"
-        listeningData[artist]['tracks'][song]['file'] = safeArtist + '.jpg'
-        listeningData[artist]['tracks'][song]['album'] = song
+        # Singles use the song's title as the "album" and the artist's profile picture as their image
+        with databaseLock:
+            listeningData[artist]['tracks'][song]['album'] = song
 
         # If the artist's profile picture is yet to be downloaded, queue it for download
-        if not os.path.isdir(f'Images/Artists/{artist}'):
+        if artist not in artworkStore['artists']:
             downloadQueue.append((getArtistImage, [artist]))
 
 
-# Formats the streaming history provided by spotify into one sorted file
+# Formats the streaming history provided by spotify into one sorted dictionary
 def formatDB():
+    global listeningRollups, listeningAnalytics
+
     # Array of all streaming history .json files
     streamLogs = [fileName for fileName in os.listdir('Spotify Data/MyData') if fileName.startswith('StreamingHistory')]
     data = {}
 
+    # Every listen with the time it ended, including skips, used to build the period rollups and analytics
+    timedListens = []
+
     # Read each listening log file
     for fileName in streamLogs:
         # Use UTF-8 encoding so unique characters can be read
-        with open('Spotify Data/Mydata/' + fileName, encoding='utf-8') as txt:
+        with open('Spotify Data/MyData/' + fileName, encoding='utf-8') as txt:
             rawData = json.load(txt)
 
             # Iterates over every song played individually
@@ -169,8 +411,10 @@ def formatDB():
                 msPlayed = listen['msPlayed']
                 trackName = listen['trackName']
 
+                timedListens.append((listen['endTime'], artist, trackName, msPlayed))
+
                 # Only save if at least 30 seconds of the song have been played
-                if int(msPlayed) >= 30000:
+                if int(msPlayed) >= SKIP_MS:
                     # If the artist has been saved before
                     if artist in data:
                         # If this song has been saved before
@@ -215,14 +459,1137 @@ def formatDB():
         # Remove the artist with the highest amount of listening time from unsorted dict
         del data[highestArtist]
 
+    # Bucket every saved listen by day and hour of the week
+    listeningRollups = buildRollups([listen for listen in timedListens if listen[3] >= SKIP_MS])
+
+    # Sessions, skips, repeat streaks and discovery dates
+    listeningAnalytics = buildAnalytics(timedListens)
+
     # Remove extracted folder
     rmtree('Spotify Data')
 
-    # Convert the database from a dictionary to a string, then encode the string to bytes
-    stringJson = json.dumps(sortedData)
-    bytesJson = stringJson.encode('utf-8')
+    return sortedData
+
+
+# The strings saved in a binary file, each string is only saved once and referred to by its position in the table
+class StringTable:
+    def __init__(self):
+        self.ids = {}
+
+    # The position of a string in the table, adding it if it isn't in the table yet
+    def stringId(self, text):
+        if text not in self.ids:
+            self.ids[text] = len(self.ids)
+        return self.ids[text]
+
+    # The table as I count, I[count] byte lengths, then every string as UTF-8
+    def pack(self):
+        encodedStrings = [text.encode('utf-8') for text in self.ids]
+        return b''.join([struct.pack(f'<I{len(encodedStrings)}I', len(encodedStrings), *map(len, encodedStrings)),
+                         *encodedStrings])
+
+
+# Reads the values in the body of a binary file in order
+class BinaryReader:
+    def __init__(self, body):
+        self.body = body
+        self.offset = 0
+
+    # Reads an amount of values and moves past them
+    def read(self, valueType, amount=1):
+        values = struct.unpack_from(f'<{amount}{valueType}', self.body, self.offset)
+        self.offset += struct.calcsize(f'<{amount}{valueType}')
+        return values
+
+    # Reads an amount of bytes and moves past them
+    def readBytes(self, length):
+        data = self.body[self.offset:self.offset + length]
+        self.offset += length
+        return data
+
+    # Reads a table saved by StringTable.pack
+    def readStrings(self):
+        return [self.readBytes(length).decode('utf-8') for length in self.read('I', self.read('I')[0])]
+
+
+# Converts the listening database into the binary format saved in DB_FILE (version 1), compressed with zlib.
+# All values are little-endian, "I" is a 4 byte unsigned integer, "i" is signed and "Q" is 8 bytes.
+#   Strings:    I count, I[count] byte lengths, then every string as UTF-8
+#   Artists:    I count, then I[count] name string ids, Q[count] total listening, I[count] track counts
+#   Tracks:     I count, then I[count] name string ids, I[count] listens, i[count] album and i[count] file
+#               string ids (-1 if not downloaded yet). Tracks are in artist order
+#   Enrichment: for each artist, I record length, then i tag count, i similar count, i match count
+#               (-1 if not downloaded yet), I[] tag string ids, I[] similar string ids, f[] matches
+#   Extras:     I length, then JSON of any other artist or track fields as {artist: {field: value, 'tracks': {}}}
+def encodeDatabase(data):
+    strings = StringTable()
+    stringId = strings.stringId
+
+    artistNames, totals, trackCounts = [], [], []
+    trackNames, listens, albums, files = [], [], [], []
+    enrichment = []
+    extras = {}
+
+    for artist, artistInfo in data.items():
+        artistNames.append(stringId(artist))
+        totals.append(artistInfo['totalListening'])
+        trackCounts.append(len(artistInfo['tracks']))
+
+        for track, trackInfo in artistInfo['tracks'].items():
+            trackNames.append(stringId(track))
+            listens.append(trackInfo['listens'])
+            albums.append(stringId(trackInfo['album']) if 'album' in trackInfo else -1)
+            files.append(stringId(trackInfo['file']) if 'file' in trackInfo else -1)
+
+            otherFields = {key: trackInfo[key] for key in trackInfo if key not in ('listens', 'album', 'file')}
+            if otherFields:
+                extras.setdefault(artist, {}).setdefault('tracks', {})[track] = otherFields
+
+        tags = [stringId(tag) for tag in artistInfo.get('tags', [])]
+        similar = [stringId(similarArtist) for similarArtist in artistInfo.get('similar', [])]
+        matches = artistInfo.get('similarMatch', [])
+
+        record = b''.join([
+            struct.pack('<3i', len(tags) if 'tags' in artistInfo else -1, len(similar) if 'similar' in artistInfo else -1,
+                        len(matches) if 'similarMatch' in artistInfo else -1),
+            struct.pack(f'<{len(tags)}I', *tags),
+            struct.pack(f'<{len(similar)}I', *similar),
+            struct.pack(f'<{len(matches)}f', *matches)
+        ])
+        enrichment.append(struct.pack('<I', len(record)) + record)
+
+        otherFields = {key: artistInfo[key] for key in artistInfo
+                       if key not in ('tracks', 'totalListening', 'tags', 'similar', 'similarMatch')}
+        if otherFields:
+            extras.setdefault(artist, {}).update(otherFields)
+
+    encodedExtras = json.dumps(extras, ensure_ascii=False).encode('utf-8')
+
+    return zlib.compress(b''.join([
+        strings.pack(),
+        struct.pack(f'<I{len(artistNames)}I', len(artistNames), *artistNames),
+        struct.pack(f'<{len(totals)}Q', *totals),
+        struct.pack(f'<{len(trackCounts)}I', *trackCounts),
+        struct.pack(f'<I{len(trackNames)}I', len(trackNames), *trackNames),
+        struct.pack(f'<{len(listens)}I', *listens),
+        struct.pack(f'<{len(albums)}i', *albums),
+        struct.pack(f'<{len(files)}i', *files),
+        *enrichment,
+        struct.pack('<I', len(encodedExtras)),
+        encodedExtras
+    ]))
+
+
+# Converts data saved by encodeDatabase back into the listening database dictionary
+def decodeDatabase(payload):
+    reader = BinaryReader(zlib.decompress(payload))
+    read = reader.read
+
+    # String table
+    strings = reader.readStrings()
+
+    # Artists
+    artistAmount = read('I')[0]
+    artistNames = read('I', artistAmount)
+    totals = read('Q', artistAmount)
+    trackCounts = read('I', artistAmount)
+
+    # Tracks
+    trackAmount = read('I')[0]
+    trackNames = read('I', trackAmount)
+    listens = read('I', trackAmount)
+    albums = read('i', trackAmount)
+    files = read('i', trackAmount)
+
+    data = {}
+    trackIndex = 0
+    for artistIndex in range(artistAmount):
+        tracks = {}
+        for _ in range(trackCounts[artistIndex]):
+            trackInfo = {'listens': listens[trackIndex]}
+            if albums[trackIndex] != -1:
+                trackInfo['album'] = strings[albums[trackIndex]]
+            if files[trackIndex] != -1:
+                trackInfo['file'] = strings[files[trackIndex]]
+
+            tracks[strings[trackNames[trackIndex]]] = trackInfo
+            trackIndex += 1
+
+        artistInfo = {'tracks': tracks, 'totalListening': totals[artistIndex]}
+
+        # Enrichment record, the record's length isn't needed to read this version
+        read('I')
+        tagCount, similarCount, matchCount = read('i', 3)
+        if tagCount != -1:
+            artistInfo['tags'] = [strings[tag] for tag in read('I', tagCount)]
+        if similarCount != -1:
+            artistInfo['similar'] = [strings[similarArtist] for similarArtist in read('I', similarCount)]
+        if matchCount != -1:
+            artistInfo['similarMatch'] = list(read('f', matchCount))
+
+        data[strings[artistNames[artistIndex]]] = artistInfo
+
+    # Any other fields
+    extrasLength = read('I')[0]
+    extras = json.loads(reader.readBytes(extrasLength))
+    for artist, otherFields in extras.items():
+        for track, otherTrackFields in otherFields.pop('tracks', {}).items():
+            data[artist]['tracks'][track].update(otherTrackFields)
+        data[artist].update(otherFields)
+
+    return data
+
+
+# Encrypts binary data and saves it after the database header, writing to a temporary file first so it is never
+# partly written
+def saveBinary(crypto, fileName, payload):
+    # Fernet's tokens are base64, saving the raw bytes makes the file a quarter smaller
+    token = urlsafe_b64decode(crypto.encrypt(payload))
+
+    with open(fileName + '.part', 'wb') as file:
+        file.write(DB_MAGIC + struct.pack('<B', DB_VERSION) + token)
+    os.replace(fileName + '.part', fileName)
+
+
+# Decrypts a file saved by saveBinary, raising InvalidToken if the password is incorrect and ValueError if the file
+# is damaged or was saved by a newer version
+def loadBinary(crypto, fileName):
+    with open(fileName, 'rb') as file:
+        header = file.read(len(DB_MAGIC) + 1)
+        if len(header) <= len(DB_MAGIC) or header[:len(DB_MAGIC)] != DB_MAGIC or header[-1] > DB_VERSION:
+            raise ValueError(f'{fileName} is not a file this version of FunnyTunes can read')
+
+        return crypto.decrypt(urlsafe_b64encode(file.read()))
+
+
+# Encrypts and saves the listening database
+def saveDatabase(crypto, data):
+    saveBinary(crypto, DB_FILE, encodeDatabase(data))
+
+
+# Loads and decrypts the listening database, raising InvalidToken if the password is incorrect
+def loadDatabase(crypto):
+    # Databases saved before the binary format
+    if not os.path.isfile(DB_FILE):
+        with open(LEGACY_DB_FILE, 'rb') as file:
+            return json.loads(crypto.decrypt(file.read()))
+
+    return decodeDatabase(loadBinary(crypto, DB_FILE))
+
+
+# The top fifty artists by listening time, and the most listened to songs (one for each saved artist)
+def rankListening():
+    artists = sorted(listeningData, key=lambda artist: listeningData[artist]['totalListening'], reverse=True)
+    songs = ((songInfo['listens'], song, artist) for artist in listeningData
+             for song, songInfo in listeningData[artist]['tracks'].items())
+
+    return artists[:50], [(song, artist) for listens, song, artist in heapq.nlargest(len(listeningData), songs)]
+
 
-    return bytesJson
+# Converts a dictionary of {day: [ms, plays]} into sorted days with running totals,
+# so the total for any range of days can be found with two binary searches
+def prefixBuckets(dayBuckets):
+    days = sorted(dayBuckets)
+
+    return {
+        'days': array('I', days),
+        'ms': array('Q', accumulate(dayBuckets[day][0] for day in days)),
+        'plays': array('I', accumulate(dayBuckets[day][1] for day in days))
+    }
+
+
+# Groups listens into daily buckets per artist and track, and the overall listening in each hour of the week.
+# Any range of days, such as a month or a year, is totalled from these with bucketTotal.
+def buildRollups(timedListens):
+    artistDays = {}
+    trackDays = {}
+    hourOfWeek = [[0, 0] for _ in range(168)]
+
+    # Parsing dates is slow, so each day is only converted once
+    dayNumbers = {}
+
+    for endTime, artist, trackName, msPlayed in timedListens:
+        # Spotify doesn't recognise this artist, we don't need this data
+        if artist == 'Unknown Artist':
+            continue
+
+        # endTime is formatted as "YYYY-MM-DD HH:MM"
+        dayString = endTime[:10]
+        if dayString not in dayNumbers:
+            dayNumbers[dayString] = date.fromisoformat(dayString).toordinal()
+        day = dayNumbers[dayString]
+
+        # Daily listening time and plays for the artist
+        bucket = artistDays.setdefault(artist, {}).setdefault(day, [0, 0])
+        bucket[0] += msPlayed
+        bucket[1] += 1
+
+        # Daily listening time and plays for the track
+        bucket = trackDays.setdefault(artist, {}).setdefault(trackName, {}).setdefault(day, [0, 0])
+        bucket[0] += msPlayed
+        bucket[1] += 1
+
+        # Listening time and plays in this hour of the week, ordinal day 1 was a monday
+        bucket = hourOfWeek[(day - 1) % 7 * 24 + int(endTime[11:13])]
+        bucket[0] += msPlayed
+        bucket[1] += 1
+
+    # No listens were saved
+    if not dayNumbers:
+        return {}
+
+    return {
+        'firstDay': min(dayNumbers.values()),
+        'lastDay': max(dayNumbers.values()),
+        'artists': {artist: prefixBuckets(artistDays[artist]) for artist in artistDays},
+        'tracks': {artist: {track: prefixBuckets(trackDays[artist][track]) for track in trackDays[artist]}
+                   for artist in trackDays},
+        'hourOfWeek': {
+            'ms': array('Q', (bucket[0] for bucket in hourOfWeek)),
+            'plays': array('I', (bucket[1] for bucket in hourOfWeek))
+        }
+    }
+
+
+# Converts the period rollups into the binary format saved in ROLLUPS_FILE, compressed with zlib.
+# Only each day's totals are saved, the running totals are added up again when they are loaded.
+#   Days:    I first day, I last day (ordinal days)
+#   Strings: I count, I[count] byte lengths, then every string as UTF-8
+#   Artists: I count, then I[count] name string ids, I[count] day counts, I[count] track counts
+#   Tracks:  I count, then I[count] name string ids, I[count] day counts. Tracks are in artist order
+#   Buckets: for each artist followed by each of its tracks, I[] days since the bucket before (the first is the day
+#            itself). Then Q[] listening time and I[] plays in the same order
+#   Hours:   Q[168] listening time, then I[168] plays in each hour of the week, starting monday 00:00
+def encodeRollups(rollups):
+    strings = StringTable()
+    stringId = strings.stringId
+
+    artistNames, artistDays, trackCounts = [], [], []
+    trackNames, trackDays = [], []
+    days, msPlayed, plays = [], [], []
+
+    # Adds a bucket's days and daily totals, returning the amount of days
+    def addBuckets(buckets):
+        previousDay = previousMs = previousPlays = 0
+
+        for day, msTotal, playTotal in zip(buckets['days'], buckets['ms'], buckets['plays']):
+            days.append(day - previousDay)
+            msPlayed.append(msTotal - previousMs)
+            plays.append(playTotal - previousPlays)
+            previousDay, previousMs, previousPlays = day, msTotal, playTotal
+
+        return len(buckets['days'])
+
+    for artist, buckets in rollups.get('artists', {}).items():
+        artistNames.append(stringId(artist))
+        artistDays.append(addBuckets(buckets))
+
+        tracks = rollups['tracks'].get(artist, {})
+        trackCounts.append(len(tracks))
+        for track, trackBuckets in tracks.items():
+            trackNames.append(stringId(track))
+            trackDays.append(addBuckets(trackBuckets))
+
+    hourOfWeek = rollups.get('hourOfWeek', {'ms': [0] * 168, 'plays': [0] * 168})
+
+    return zlib.compress(b''.join([
+        struct.pack('<2I', rollups.get('firstDay', 0), rollups.get('lastDay', 0)),
+        strings.pack(),
+        struct.pack(f'<I{len(artistNames)}I', len(artistNames), *artistNames),
+        struct.pack(f'<{len(artistDays)}I', *artistDays),
+        struct.pack(f'<{len(trackCounts)}I', *trackCounts),
+        struct.pack(f'<I{len(trackNames)}I', len(trackNames), *trackNames),
+        struct.pack(f'<{len(trackDays)}I', *trackDays),
+        struct.pack(f'<{len(days)}I', *days),
+        struct.pack(f'<{len(msPlayed)}Q', *msPlayed),
+        struct.pack(f'<{len(plays)}I', *plays),
+        struct.pack('<168Q', *hourOfWeek['ms']),
+        struct.pack('<168I', *hourOfWeek['plays'])
+    ]))
+
+
+# Converts data saved by encodeRollups back into the period rollups
+def decodeRollups(payload):
+    reader = BinaryReader(zlib.decompress(payload))
+    read = reader.read
+
+    firstDay, lastDay = read('I', 2)
+
+    # String table
+    strings = reader.readStrings()
+
+    # Artists
+    artistAmount = read('I')[0]
+    artistNames = read('I', artistAmount)
+    artistDays = read('I', artistAmount)
+    trackCounts = read('I', artistAmount)
+
+    # Tracks
+    trackAmount = read('I')[0]
+    trackNames = read('I', trackAmount)
+    trackDays = read('I', trackAmount)
+
+    # No listens were saved
+    if not artistAmount:
+        return {}
+
+    # Buckets
+    bucketAmount = sum(artistDays) + sum(trackDays)
+    days = read('I', bucketAmount)
+    msPlayed = read('Q', bucketAmount)
+    plays = read('I', bucketAmount)
+    bucketIndex = 0
+
+    # Hours of the week
+    hourOfWeek = {'ms': array('Q', read('Q', 168)), 'plays': array('I', read('I', 168))}
+
+    # The next amount of days, with running totals
+    def nextBuckets(amount):
+        nonlocal bucketIndex
+        section = slice(bucketIndex, bucketIndex + amount)
+        bucketIndex += amount
+
+        return {
+            'days': array('I', accumulate(days[section])),
+            'ms': array('Q', accumulate(msPlayed[section])),
+            'plays': array('I', accumulate(plays[section]))
+        }
+
+    rollups = {'firstDay': firstDay, 'lastDay': lastDay, 'artists': {}, 'tracks': {}, 'hourOfWeek': hourOfWeek}
+    trackIndex = 0
+    for artistIndex in range(artistAmount):
+        artist = strings[artistNames[artistIndex]]
+        rollups['artists'][artist] = nextBuckets(artistDays[artistIndex])
+
+        tracks = rollups['tracks'][artist] = {}
+        for _ in range(trackCounts[artistIndex]):
+            tracks[strings[trackNames[trackIndex]]] = nextBuckets(trackDays[trackIndex])
+            trackIndex += 1
+
+    return rollups
+
+
+# Loads the period rollups, databases created before rollups existed have none.
+# Rollups that can't be read only hide the period selection rather than stopping the database from opening.
+def loadRollups(crypto):
+    if not os.path.isfile(ROLLUPS_FILE):
+        return {}
+
+    try:
+        return decodeRollups(loadBinary(crypto, ROLLUPS_FILE))
+    except ValueError:
+        return {}
+
+
+# The listening time ('ms') or plays ('plays') of a bucket between two days (inclusive)
+def bucketTotal(buckets, firstDay, lastDay, field):
+    days = buckets['days']
+    totals = buckets[field]
+
+    startIndex = bisect_left(days, firstDay)
+    endIndex = bisect_right(days, lastDay)
+
+    # No listens within the period
+    if endIndex <= startIndex:
+        return 0
+
+    if startIndex == 0:
+        return totals[endIndex - 1]
+    return totals[endIndex - 1] - totals[startIndex - 1]
+
+
+# Finds listening patterns in one pass over every listen (including skips) in the order they were played:
+#   sessions:       columns of each session's start (minutes since 0001-01-01), length in minutes and listens
+#   artists:        {artist: [plays, skips, first listen date]}
+#   tracks:         {artist: {track: [plays, skips, first listen date, longest repeat streak]}}
+#   longestStreaks: the ten longest runs of one song played back to back, as [streak, track, artist, first listen date]
+def buildAnalytics(timedListens):
+    # endTime is formatted as "YYYY-MM-DD HH:MM", so sorting the text sorts the listens by time
+    timedListens = sorted(timedListens, key=lambda listen: listen[0])
+
+    sessions = {'start': array('q'), 'minutes': array('I'), 'listens': array('I')}
+    artists = {}
+    tracks = {}
+
+    # Parsing dates is slow, so each day is only converted once
+    dayNumbers = {}
+
+    sessionStart = sessionEnd = None
+    sessionListens = 0
+    streakSong = None
+    streakLength = 0
+
+    for endTime, artist, trackName, msPlayed in timedListens:
+        dayString = endTime[:10]
+        if dayString not in dayNumbers:
+            dayNumbers[dayString] = date.fromisoformat(dayString).toordinal() * 1440
+
+        # Minutes since 0001-01-01, the start is estimated from how long the song was played
+        end = dayNumbers[dayString] + int(endTime[11:13]) * 60 + int(endTime[14:16])
+        start = end - msPlayed // 60000
+
+        # A long enough gap since the last listen starts a new session
+        if sessionEnd is None or start - sessionEnd > SESSION_GAP:
+            if sessionEnd is not None:
+                sessions['start'].append(sessionStart)
+                sessions['minutes'].append(sessionEnd - sessionStart)
+                sessions['listens'].append(sessionListens)
+            sessionStart = start
+            sessionListens = 0
+
+        sessionEnd = max(sessionEnd or end, end)
+        sessionListens += 1
+
+        # Songs played back to back, skipping a song ends the streak
+        skipped = msPlayed < SKIP_MS
+        if skipped:
+            streakSong = None
+            streakLength = 0
+        elif streakSong == (artist, trackName):
+            streakLength += 1
+        else:
+            streakSong = (artist, trackName)
+            streakLength = 1
+
+        # Spotify doesn't recognise this artist, we don't need this data
+        if artist == 'Unknown Artist':
+            continue
+
+        artistStats = artists.setdefault(artist, [0, 0, dayString])
+        artistStats[0] += 1
+        artistStats[1] += skipped
+
+        trackStats = tracks.setdefault(artist, {}).setdefault(trackName, [0, 0, dayString, 0])
+        trackStats[0] += 1
+        trackStats[1] += skipped
+        trackStats[3] = max(trackStats[3], streakLength)
+
+    # No listens were saved
+    if sessionEnd is None:
+        return {}
+
+    # The final session
+    sessions['start'].append(sessionStart)
+    sessions['minutes'].append(sessionEnd - sessionStart)
+    sessions['listens'].append(sessionListens)
+
+    # A song played once isn't a repeat streak
+    streaks = ((trackStats[3], track, artist, trackStats[2]) for artist in tracks
+               for track, trackStats in tracks[artist].items() if trackStats[3] >= 2)
+
+    return {
+        'sessions': {column: list(values) for column, values in sessions.items()},
+        'artists': artists,
+        'tracks': tracks,
+        'longestStreaks': [list(streak) for streak in heapq.nlargest(10, streaks)]
+    }
+
+
+# Converts the listening analytics into the binary format saved in ANALYTICS_FILE, compressed with zlib.
+# Dates are saved as ordinal days.
+#   Strings:  I count, I[count] byte lengths, then every string as UTF-8
+#   Artists:  I count, then I[count] name string ids, I[count] plays, I[count] skips, I[count] first listens,
+#             I[count] track counts
+#   Tracks:   I count, then I[count] name string ids, I[count] plays, I[count] skips, I[count] first listens,
+#             I[count] longest streaks. Tracks are in artist order
+#   Sessions: I count, then q[count] starts, I[count] minutes, I[count] listens
+#   Streaks:  I count, then I[count] positions of the tracks with the longest streaks
+def encodeAnalytics(analytics):
+    strings = StringTable()
+    stringId = strings.stringId
+
+    artists = [[], [], [], [], []]
+    tracks = [[], [], [], [], []]
+    trackPositions = {}
+
+    for artist, (plays, skips, firstListen) in analytics.get('artists', {}).items():
+        artistTracks = analytics['tracks'].get(artist, {})
+        for column, value in zip(artists, (stringId(artist), plays, skips, date.fromisoformat(firstListen).toordinal(),
+                                           len(artistTracks))):
+            column.append(value)
+
+        for track, (plays, skips, firstListen, streak) in artistTracks.items():
+            trackPositions[(track, artist)] = len(trackPositions)
+            for column, value in zip(tracks, (stringId(track), plays, skips,
+                                              date.fromisoformat(firstListen).toordinal(), streak)):
+                column.append(value)
+
+    sessions = analytics.get('sessions', {'start': [], 'minutes': [], 'listens': []})
+    streaks = [trackPositions[(track, artist)] for streak, track, artist, firstListen
+               in analytics.get('longestStreaks', [])]
+
+    return zlib.compress(b''.join([
+        strings.pack(),
+        struct.pack('<I', len(artists[0])),
+        *[struct.pack(f'<{len(column)}I', *column) for column in artists],
+        struct.pack('<I', len(tracks[0])),
+        *[struct.pack(f'<{len(column)}I', *column) for column in tracks],
+        struct.pack(f'<I{len(sessions["start"])}q', len(sessions['start']), *sessions['start']),
+        struct.pack(f'<{len(sessions["minutes"])}I', *sessions['minutes']),
+        struct.pack(f'<{len(sessions["listens"])}I', *sessions['listens']),
+        struct.pack(f'<I{len(streaks)}I', len(streaks), *streaks)
+    ]))
+
+
+# Converts data saved by encodeAnalytics back into the listening analytics
+def decodeAnalytics(payload):
+    reader = BinaryReader(zlib.decompress(payload))
+    read = reader.read
+
+    # String table
+    strings = reader.readStrings()
+
+    # Converting dates is slow, so each day is only converted once
+    dayStrings = {}
+
+    def dayString(day):
+        if day not in dayStrings:
+            dayStrings[day] = date.fromordinal(day).isoformat()
+        return dayStrings[day]
+
+    artistAmount = read('I')[0]
+    artistNames, artistPlays, artistSkips, artistFirstListens, trackCounts = [read('I', artistAmount) for _ in range(5)]
+
+    trackAmount = read('I')[0]
+    trackNames, trackPlays, trackSkips, trackFirstListens, trackStreaks = [read('I', trackAmount) for _ in range(5)]
+
+    sessionAmount = read('I')[0]
+    sessions = {'start': list(read('q', sessionAmount)), 'minutes': list(read('I', sessionAmount)),
+                'listens': list(read('I', sessionAmount))}
+    streaks = read('I', read('I')[0])
+
+    # No listens were saved
+    if not sessionAmount:
+        return {}
+
+    artists = {}
+    tracks = {}
+    trackArtists = []
+    for artistIndex in range(artistAmount):
+        artist = strings[artistNames[artistIndex]]
+        artists[artist] = [artistPlays[artistIndex], artistSkips[artistIndex],
+                           dayString(artistFirstListens[artistIndex])]
+
+        tracks[artist] = {}
+        for _ in range(trackCounts[artistIndex]):
+            trackIndex = len(trackArtists)
+            tracks[artist][strings[trackNames[trackIndex]]] = [trackPlays[trackIndex], trackSkips[trackIndex],
+                                                               dayString(trackFirstListens[trackIndex]),
+                                                               trackStreaks[trackIndex]]
+            trackArtists.append(artist)
+
+    longestStreaks = [[trackStreaks[trackIndex], strings[trackNames[trackIndex]], trackArtists[trackIndex],
+                       dayString(trackFirstListens[trackIndex])] for trackIndex in streaks]
+
+    return {'sessions': sessions, 'artists': artists, 'tracks': tracks, 'longestStreaks': longestStreaks}
+
+
+# Loads the listening analytics, databases created before analytics existed have none.
+# Analytics that can't be read only hide the listening habits rather than stopping the database from opening.
+def loadAnalytics(crypto):
+    if not os.path.isfile(ANALYTICS_FILE):
+        return {}
+
+    try:
+        return decodeAnalytics(loadBinary(crypto, ANALYTICS_FILE))
+    except ValueError:
+        return {}
+
+
+# The percentage of an artist's listens that were skipped, or None if the database was created before analytics
+def artistSkipRate(artist):
+    if artist not in listeningAnalytics.get('artists', {}):
+        return
+
+    plays, skips, firstListen = listeningAnalytics['artists'][artist]
+    return 100 * skips // plays
+
+
+# The amount of listening sessions and their average length in minutes
+def sessionSummary():
+    sessions = listeningAnalytics['sessions']
+    return len(sessions['start']), sum(sessions['minutes']) // len(sessions['start'])
+
+
+# The listening time in each hour of the week starting monday 00:00, databases created before rollups have none
+def listeningByHour():
+    if not listeningRollups:
+        return [0] * 168
+    return listeningRollups['hourOfWeek']['ms']
+
+
+# The longest listening sessions, as (minutes, listens, date)
+def longestSessions(amount):
+    sessions = listeningAnalytics['sessions']
+    longest = heapq.nlargest(amount, zip(sessions['minutes'], sessions['listens'], sessions['start']))
+
+    return [(minutes, listens, date.fromordinal(start // 1440).isoformat()) for minutes, listens, start in longest]
+
+
+# The songs skipped most often out of those played at least minimumPlays times, as (skip percentage, song, artist)
+def mostSkippedSongs(amount, minimumPlays=10):
+    tracks = listeningAnalytics['tracks']
+    skipRates = ((100 * trackStats[1] // trackStats[0], song, artist) for artist in tracks
+                 for song, trackStats in tracks[artist].items() if trackStats[0] >= minimumPlays)
+
+    return [skipRate for skipRate in heapq.nlargest(amount, skipRates) if skipRate[0]]
+
+
+# The artists first listened to most recently out of those played at least minimumPlays times, as (date, artist)
+def recentDiscoveries(amount, minimumPlays=20):
+    artists = listeningAnalytics['artists']
+
+    return heapq.nlargest(amount, ((artistStats[2], artist) for artist, artistStats in artists.items()
+                                   if artistStats[0] >= minimumPlays))
+
+
+# The periods that can be selected, as {name: (firstDay, lastDay)}
+def rollupPeriods():
+    periods = {'All Time': None}
+
+    # Databases created before rollups existed have no timestamps
+    if not listeningRollups:
+        return periods
+
+    firstDay = listeningRollups['firstDay']
+    lastDay = listeningRollups['lastDay']
+
+    # Each calendar year covered by the listening history
+    for year in range(date.fromordinal(firstDay).year, date.fromordinal(lastDay).year + 1):
+        periods[str(year)] = (date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal())
+
+    # The most recent month of listening
+    periods['Last 30 Days'] = (lastDay - 29, lastDay)
+
+    return periods
+
+
+# The artists with the most listening time within a period
+def topArtistsInPeriod(period, amount):
+    firstDay, lastDay = period
+    artists = listeningRollups['artists']
+
+    totals = ((bucketTotal(artists[artist], firstDay, lastDay, 'ms'), artist) for artist in artists)
+    return [artist for total, artist in heapq.nlargest(amount, totals) if total]
+
+
+# The songs with the most plays within a period, as (song, artist)
+def topSongsInPeriod(period, amount):
+    firstDay, lastDay = period
+    tracks = listeningRollups['tracks']
+
+    totals = ((bucketTotal(tracks[artist][song], firstDay, lastDay, 'plays'), song, artist)
+              for artist in tracks for song in tracks[artist])
+    return [(song, artist) for total, song, artist in heapq.nlargest(amount, totals) if total]
+
+
+# Encrypts a dictionary and saves it alongside the listening database, replacing the old file in one step
+def saveEncrypted(crypto, fileName, data):
+    with open(fileName + '.part', 'wb') as file:
+        file.write(crypto.encrypt(json.dumps(data, ensure_ascii=False).encode('utf-8')))
+    os.replace(fileName + '.part', fileName)
+
+
+# Decrypts a file saved by saveEncrypted, returning an empty dictionary if it doesn't exist or can't be read
+def loadEncrypted(crypto, fileName):
+    from cryptography.fernet import InvalidToken
+
+    if not os.path.isfile(fileName):
+        return {}
+
+    with open(fileName, 'rb') as file:
+        try:
+            return json.loads(crypto.decrypt(file.read()))
+        except InvalidToken:
+            return {}
+
+
+# Lowercases text and removes accents so "Beyoncé" can be found by searching "beyonce"
+def normaliseText(text):
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).replace('\n', ' ')
+
+
+# One type of search result (artists, tracks or albums).
+# Every name is joined into a single string ordered from highest to lowest score,
+# so str.find returns the best matches first and searching can stop once enough are found.
+# Results added after the names were joined are kept pending and checked one by one, as joining is slow.
+class SearchSection:
+    def __init__(self):
+        self.entries = {}
+        self.names = ''
+        self.offsets = []
+        self.keys = []
+        self.pending = {}
+
+    # Adds or replaces a result, with a score used to rank it (listens or total listening)
+    def add(self, key, name, score, result):
+        self.entries[key] = self.pending[key] = (score, normaliseText(name), result)
+
+    # Joins the names of some entries, returning (names, offsets, keys).
+    # It doesn't change the section, so it can run on a copy of the entries without holding the index's lock.
+    @staticmethod
+    def joinNames(entries):
+        keys = sorted(entries, key=lambda key: entries[key][0], reverse=True)
+        offsets = []
+
+        position = 0
+        for key in keys:
+            offsets.append(position)
+            position += len(entries[key][1]) + 1
+
+        # Each name starts after a newline so "\n" + query only matches the start of a name
+        names = ''.join('\n' + entries[key][1] for key in keys)
+        return names, offsets, keys
+
+    # Searches names joined from a copy of the entries, results added or changed since the copy stay pending
+    def useNames(self, joined, entries):
+        self.names, self.offsets, self.keys = joined
+        self.pending = {key: entry for key, entry in self.pending.items() if entries.get(key) is not entry}
+
+    # Joins every name, used when the index is built
+    def rebuild(self):
+        self.useNames(self.joinNames(self.entries), self.entries)
+
+    # Returns up to amount results, matches at the start of a name first, then the start of a word, then anywhere
+    def search(self, query, amount):
+        found = []
+        for pattern in ('\n' + query, ' ' + query, query):
+            matches = []
+            position = self.names.find(pattern)
+
+            while position != -1 and len(matches) < amount - len(found):
+                # The pattern's leading newline or space belongs to the matched name
+                index = bisect_right(self.offsets, position + len(pattern) - len(query)) - 1
+                key = self.keys[index]
+
+                # Results changed since the names were joined are matched with the pending results instead
+                if key not in found and key not in self.pending:
+                    matches.append(key)
+
+                # Continue searching from the next name
+                if index + 1 == len(self.offsets):
+                    break
+                position = self.names.find(pattern, self.offsets[index + 1])
+
+            # Pending results are ranked alongside the joined matches by their score
+            matches += [key for key, (score, name, result) in self.pending.items()
+                        if pattern in '\n' + name and key not in found]
+            matches.sort(key=lambda key: self.entries[key][0], reverse=True)
+            found += matches[:amount - len(found)]
+
+            if len(found) == amount:
+                break
+
+        return [self.entries[key][2] for key in found]
+
+
+# Searchable artists, tracks and albums, built when the database is unlocked
+class SearchIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.artists = SearchSection()
+        self.tracks = SearchSection()
+        self.albums = SearchSection()
+
+        # The listens of each song in an album, so re-downloading a song's info doesn't count it twice
+        self.albumSongs = {}
+
+        # Whether pending albums are being joined into the album names. Set while the index is built, as every name is
+        # joined once at the end
+        self.merging = True
+
+        for artist in listeningData:
+            self.artists.add(artist, artist, listeningData[artist]['totalListening'], artist)
+
+            for song, songInfo in listeningData[artist]['tracks'].items():
+                self.tracks.add((song, artist), song, songInfo['listens'], (song, artist))
+
+                if 'album' in songInfo:
+                    self.addAlbum(songInfo['album'], artist, song, songInfo['listens'])
+
+        # Join the names now rather than on the first search
+        self.artists.rebuild()
+        self.tracks.rebuild()
+        self.albums.rebuild()
+        self.merging = False
+
+    # Adds an album as its songs are enriched, ranked by the total listens of its songs
+    def addAlbum(self, album, artist, song, listens):
+        # Singles use the song's title as the album, and are already searchable as a track
+        if album == song:
+            return
+
+        with self.lock:
+            songs = self.albumSongs.setdefault((album, artist), {})
+            songs[song] = listens
+            self.albums.add((album, artist), album, sum(songs.values()), (album, artist))
+
+            if self.merging or len(self.albums.pending) < SEARCH_MERGE_SIZE:
+                return
+            self.merging = True
+            entries = self.albums.entries.copy()
+
+        # Albums are added by the enrichment thread, so the names are joined here without the lock and searches
+        # continue with the old names until they are ready
+        joined = SearchSection.joinNames(entries)
+
+        with self.lock:
+            self.albums.useNames(joined, entries)
+            self.merging = False
+
+    # Returns {'artists': [artist], 'tracks': [(song, artist)], 'albums': [(album, artist)]}
+    def search(self, query, amount=5):
+        query = normaliseText(query.strip())
+        if not query:
+            return {'artists': [], 'tracks': [], 'albums': []}
+
+        with self.lock:
+            return {
+                'artists': self.artists.search(query, amount),
+                'tracks': self.tracks.search(query, amount),
+                'albums': self.albums.search(query, amount)
+            }
+
+
+# Every piece of data the background enrichment fetches, in the order it is fetched.
+# Each task is a tab separated string so it can be saved in the checkpoint file: kind, artist and (for songs) the song
+def enrichmentTasks():
+    tasks = []
+
+    for artist in topArtists:
+        tasks.append(f'data\t{artist}')
+        tasks.append(f'image\t{artist}')
+
+    for song, artist in topSongs:
+        tasks.append(f'song\t{artist}\t{song}')
+
+    return tasks
+
+
+# Whether the data a task fetches has already been saved
+def enrichmentFinished(task):
+    kind, artist, *song = task.split('\t', 2)
+
+    if kind == 'data':
+        # Databases saved before match weights were downloaded only have a few similar artists, without weights
+        return 'tags' in listeningData[artist] and 'similarMatch' in listeningData[artist]
+    if kind == 'image':
+        return artist in artworkStore['artists']
+    return 'album' in listeningData[artist]['tracks'][song[0]]
+
+
+# Finds the next task that needs to be fetched, continuing from where the last task was found.
+# Tasks that have failed too many times or are waiting to be retried are skipped.
+def nextEnrichmentTask():
+    tasks = enrichmentTasks()
+
+    with enrichmentLock:
+        for offset in range(len(tasks)):
+            index = (enrichmentState['position'] + offset) % len(tasks)
+            task = tasks[index]
+
+            if task in enrichmentState['failed']:
+                continue
+            if enrichmentState['retryAfter'].get(task, 0) > time.time() or enrichmentFinished(task):
+                continue
+
+            enrichmentState['position'] = index + 1
+            return task
+
+
+# Saves the database and then the checkpoint file, so the checkpoint never lists a task as done when its data
+# wasn't saved
+def saveEnrichment():
+    global lastEnrichmentSave, enrichmentUnsaved
+    from cryptography.fernet import Fernet
+
+    crypto = Fernet(dbKey)
+
+    with databaseLock:
+        saveDatabase(crypto, listeningData)
+
+    with enrichmentLock:
+        saveEncrypted(crypto, 'Enrichment.json', enrichmentState)
+
+    lastEnrichmentSave = time.time()
+    enrichmentUnsaved = False
+
+
+# Fetches a task's data and records the outcome, saving every ENRICHMENT_SAVE_INTERVAL seconds
+def runEnrichment(task):
+    global enrichmentUnsaved
+
+    kind, artist, *song = task.split('\t', 2)
+
+    try:
+        if kind == 'data':
+            getArtistData(artist)
+        elif kind == 'image':
+            getArtistImage(artist)
+        else:
+            getSongImage((song[0], artist))
+    except Exception:
+        # Network errors and unexpected responses are retried later
+        pass
+
+    with enrichmentLock:
+        if enrichmentFinished(task):
+            if task not in enrichmentState['done']:
+                enrichmentState['done'].append(task)
+            enrichmentState['attempts'].pop(task, None)
+            enrichmentState['retryAfter'].pop(task, None)
+        else:
+            # Wait longer after each failed attempt, giving up after five
+            attempts = enrichmentState['attempts'].get(task, 0) + 1
+            enrichmentState['attempts'][task] = attempts
+
+            if attempts == 5:
+                enrichmentState['failed'].append(task)
+            else:
+                enrichmentState['retryAfter'][task] = time.time() + 60 * 2 ** attempts
+
+    enrichmentUnsaved = True
+    if time.time() >= lastEnrichmentSave + ENRICHMENT_SAVE_INTERVAL:
+        saveEnrichment()
+
+
+# Thread that fetches every artist and top song's data in the background, one request at a time
+def enrichLibrary():
+    # Runs in the background forever
+    while True:
+        task = nextEnrichmentTask()
+
+        if task:
+            runEnrichment(task)
+        else:
+            # Everything has been fetched or is waiting to be retried, so save what hasn't been saved yet
+            if enrichmentUnsaved:
+                saveEnrichment()
+            time.sleep(60)
+
+
+# The percentage of artists with genres, similar artists and images
+def enrichmentCoverage():
+    artists = list(listeningData)
+    if not artists:
+        return {'tags': 0, 'similar': 0, 'images': 0}
+
+    return {
+        'tags': 100 * sum('tags' in listeningData[artist] for artist in artists) // len(artists),
+        'similar': 100 * sum('similar' in listeningData[artist] for artist in artists) // len(artists),
+        'images': 100 * sum(artist in artworkStore['artists'] for artist in artists) // len(artists)
+    }
+
+
+# Similar artists as a graph, each artist has an integer id with arrays of the ids of its similar artists
+# and how similar they are (0 to 1), so recommendations can be found by following the most similar artists
+class SimilarityGraph:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.names = []
+        self.ids = {}
+        self.neighbours = []
+        self.weights = []
+
+        for artist in listeningData:
+            if 'similar' in listeningData[artist]:
+                self.addArtist(artist, listeningData[artist]['similar'], listeningData[artist].get('similarMatch'))
+
+    # Returns an artist's id, giving it a new one if it isn't in the graph yet
+    def artistId(self, artist):
+        if artist not in self.ids:
+            self.ids[artist] = len(self.names)
+            self.names.append(artist)
+            self.neighbours.append(array('I'))
+            self.weights.append(array('f'))
+        return self.ids[artist]
+
+    # Adds or replaces an artist's similar artists
+    def addArtist(self, artist, similar, matches=None):
+        # Older databases saved similar artists without how similar they are, so estimate it from their order
+        if not matches:
+            matches = [1 - index / len(similar) for index in range(len(similar))]
+
+        with self.lock:
+            artistId = self.artistId(artist)
+            self.neighbours[artistId] = array('I', [self.artistId(similarArtist) for similarArtist in similar])
+            self.weights[artistId] = array('f', matches)
+
+    # Artists similar to the seed artists, excluding the played artists.
+    # Similar artists are scored by how similar they are to each seed, and artists similar to those
+    # (two steps away) add half of their score again.
+    def recommend(self, seeds, played, amount=10):
+        scores = {}
+
+        with self.lock:
+            frontier = {self.ids[seed]: 1.0 for seed in seeds if seed in self.ids}
+
+            for _ in range(2):
+                nextFrontier = {}
+                for artistId, score in frontier.items():
+                    for neighbour, weight in zip(self.neighbours[artistId], self.weights[artistId]):
+                        scores[neighbour] = scores.get(neighbour, 0) + score * weight
+                        nextFrontier[neighbour] = nextFrontier.get(neighbour, 0) + score * weight / 2
+                frontier = nextFrontier
+
+            scores = ((score, self.names[artistId]) for artistId, score in scores.items()
+                      if self.names[artistId] not in played)
+            return [artist for score, artist in heapq.nlargest(amount, scores)]
+
+    # Groups artists that are connected by similar artists at least minimumMatch similar
+    def clusters(self, artists, minimumMatch=0.2):
+        with self.lock:
+            artistIds = [self.ids[artist] for artist in artists if artist in self.ids]
+            included = set(artistIds)
+
+            # Union-find, each artist starts in its own group
+            parents = {artistId: artistId for artistId in artistIds}
+
+            def findGroup(artistId):
+                while parents[artistId] != artistId:
+                    parents[artistId] = parents[parents[artistId]]
+                    artistId = parents[artistId]
+                return artistId
+
+            for artistId in artistIds:
+                for neighbour, weight in zip(self.neighbours[artistId], self.weights[artistId]):
+                    if neighbour in included and weight >= minimumMatch:
+                        parents[findGroup(neighbour)] = findGroup(artistId)
+
+            groups = {}
+            for artistId in artistIds:
+                groups.setdefault(findGroup(artistId), []).append(self.names[artistId])
+
+        # Largest groups first, artists without any similar artists in the library aren't a group
+        return sorted((group for group in groups.values() if len(group) > 1), key=len, reverse=True)
+
+
+# Artists similar to the user's top ten that they have never listened to
+def recommendArtists(amount=10):
+    played = listeningRollups['artists'] if listeningRollups else listeningData
+    return similarityGraph.recommend(topArtists[:10], played, amount)
+
+
+# Groups of similar artists within the user's library
+def libraryClusters():
+    return similarityGraph.clusters(listeningData)
+
+
+# Returns as many items as fit within a number of characters, so text isn't longer than the window
+def fitText(items, limit=39):
+    fitted = []
+    characterTotal = 0
+
+    for item in items:
+        characterTotal += len(item)
+
+        # Text can't exceed the limit (range validation)
+        if characterTotal > limit:
+            break
+        fitted.append(item)
+
+    return fitted
 
 
 # Thread responsible for starting queued requests, five at a time with a pause in between to avoid rate limits
@@ -235,17 +1602,19 @@ def downloadData():
 
         # Start first five requests
         for _ in range(5):
-            # If the queue is not empty
-            if downloadQueue:
-                # Get the first item from the queue, then remove it
-                target, args = downloadQueue[0]
-                downloadQueue.pop(0)
+            # If the queue is empty
+            if not downloadQueue:
+                break
 
-                # Start the thread
-                downloadThread = threading.Thread(target=target, args=args)
-                downloadThread.start()
+            # Get the first item from the queue, then remove it
+            target, args = downloadQueue[0]
+            downloadQueue.pop(0)
 
-                threads.append(downloadThread)
+            # Start the thread
+            downloadThread = threading.Thread(target=target, args=args)
+            downloadThread.start()
+
+            threads.append(downloadThread)
 
         # Wait until the threads have finished
         for thread in threads:
@@ -256,38 +1625,76 @@ def downloadData():
         time.sleep(1)
 
 
-# Attempts to load an image and returns a placeholder if the image is not yet downloaded
-def loadImage(loadedImages, placeHolders, artistImage, artistOrSong, width):
-    # If the image has been downloaded but hasn't been displayed yet (existence validation)
-    if os.path.isfile(artistImage) and artistOrSong not in loadedImages:
-        try:
-            # Attempt to load the image and resize it to the correct dimensions
-            imageObject = ImageTk.PhotoImage(PILImage.open(artistImage).resize((width, width)))
-            loadedImages.append(artistOrSong)
-        except UnidentifiedImageError:
-            # The file exists but the image is still being downloaded
-            return
-    # If the image does not exist yet and a placeholder has not yet been displayed
-    elif not os.path.isfile(artistImage) and artistOrSong not in placeHolders:
-        # Display a placeholder while the image downloads and resize it to the correct dimensions
-        imageObject = ImageTk.PhotoImage(PILImage.open('Assets/placeholder.png').resize((width, width)))
-        placeHolders.append(artistOrSong)
-    else:
-        return
-    return imageObject
+# Imports the slow modules in the background so they are ready by the time they are needed
+def preloadModules():
+    import requests
+    import bs4
+    import cryptography.fernet
+    import PIL.ImageTk
+
+
+# Loads an image from the Assets folder, each image is only decoded once and then shared between screens
+def loadAsset(fileName):
+    if fileName not in assetCache:
+        assetCache[fileName] = PhotoImage(file=f'Assets/{fileName}')
+    return assetCache[fileName]
+
 
+# The placeholder image resized to a width, each size is only created once
+def loadPlaceholder(width):
+    from PIL import ImageTk
+    from PIL import Image as PILImage
 
-def loadArtist(loadedImages, placeHolders, artist, width):
-    # Replace forbidden file characters with an underscore
-    safeArtistName = regex.sub(r'[\\/*?:"<>.|]', '_', artist)
-    safeFileName = regex.sub(r'[\\/*?:"<>.|]', '_', artist) + '.jpg'
+    if ('placeholder', width) not in placeholderCache:
+        placeholder = PILImage.open('Assets/placeholder.png').resize((width, width))
+        placeholderCache[('placeholder', width)] = ImageTk.PhotoImage(placeholder)
+    return placeholderCache[('placeholder', width)]
 
-    # File path to the artist's image
-    artistImage = f'Images/Artists/{safeArtistName}/{safeFileName}'
 
-    # If the image has not been loaded yet
-    if artistImage not in loadedImages:
-        return loadImage(loadedImages, placeHolders, artistImage, artist, width)
+# An empty image used for slots with nothing to show
+def loadBlank(width):
+    if ('blank', width) not in placeholderCache:
+        placeholderCache[('blank', width)] = PhotoImage(width=width, height=width)
+    return placeholderCache[('blank', width)]
+
+
+# Loads an image resized to a width, returning a placeholder if the image is not yet downloaded.
+# Only the most recently displayed images are kept so memory doesn't grow as more pages are viewed.
+def loadImage(imagePath, width):
+    from PIL import ImageTk, UnidentifiedImageError
+    from PIL import Image as PILImage
+
+    # If the image has not been downloaded yet (existence validation)
+    if not os.path.isfile(imagePath):
+        return loadPlaceholder(width)
+
+    if (imagePath, width) in imageCache:
+        imageCache.move_to_end((imagePath, width))
+        return imageCache[(imagePath, width)]
+
+    try:
+        # Attempt to load the image and resize it to the correct dimensions
+        imageObject = ImageTk.PhotoImage(PILImage.open(imagePath).resize((width, width)))
+    except UnidentifiedImageError:
+        # The downloaded file is not an image (images are renamed into place once fully written)
+        imageObject = loadPlaceholder(width)
+
+    imageCache[(imagePath, width)] = imageObject
+    if len(imageCache) > 64:
+        imageCache.popitem(last=False)
+
+    return imageObject
+
+
+# Changes a label's text or image only if it is different, so unchanged widgets aren't redrawn
+def updateLabel(label, text=None, image=None):
+    if text is not None and label['text'] != text:
+        label['text'] = text
+
+    # Labels need to keep a reference to their image so it isn't garbage collected
+    if image is not None and getattr(label, 'image', None) is not image:
+        label['image'] = image
+        label.image = image
 
 
 # Main GUI Class
@@ -306,19 +1713,42 @@ class GUI(Tk):
         self.window.grid_rowconfigure(0, weight=1)
         self.window.grid_columnconfigure(0, weight=1)
 
+        # Import the slow modules once the first window is showing
+        self.after(100, lambda: threading.Thread(target=preloadModules, daemon=True).start())
+
+        # Screens that are kept and reused, and the frame currently displayed
+        self.screens = {}
+        self.currentFrame = None
+
         # If a listening database already exists
-        if os.path.isfile('ListeningDB.json'):
+        if os.path.isfile(DB_FILE) or os.path.isfile(LEGACY_DB_FILE):
             self.showFrame(PasswordScreen(self.window, True, self))
         else:
             # Display the start window
-            start = StartScreen(self.window, self)
-            start.grid(row=0, column=0, sticky="nsew")
+            self.showFrame(StartScreen(self.window, self))
+
+    # Displays a frame in place of the current one. Screens opened with openScreen are hidden and stopped
+    # so they can be reused, any other frame is destroyed as it won't be shown again.
+    def showFrame(self, frame):
+        if self.currentFrame is not None and self.currentFrame is not frame:
+            if self.currentFrame in self.screens.values():
+                self.currentFrame.stop()
+                self.currentFrame.grid_remove()
+            else:
+                self.currentFrame.destroy()
 
-    @staticmethod
-    def showFrame(frame):
         # Grid the frame and then raise it to be visible
         frame.grid(row=0, column=0, sticky="nsew")
         frame.tkraise()
+        self.currentFrame = frame
+
+    # Displays a screen, only creating it the first time it is opened
+    def openScreen(self, screen, *args):
+        if screen not in self.screens:
+            self.screens[screen] = screen(self.window, self)
+
+        self.showFrame(self.screens[screen])
+        self.screens[screen].start(*args)
 
 
 # Screen displayed upon launching the program
@@ -332,16 +1762,12 @@ class StartScreen(Frame):
         self['bg'] = 'black'
 
         # Logo text
-        self.logoText = PhotoImage(file="Assets/logoWhite.png")
-        Label(self, image=self.logoText, bg='black').place(x=0, y=0)
+        Label(self, image=loadAsset('logoWhite.png'), bg='black').place(x=0, y=0)
 
         # Button images
-        self.zipImage = PhotoImage(file="Assets/zipImage.png")
-        self.spotifyImage = PhotoImage(file="Assets/spotifyImage.png")
-
-        Button(self, image=self.zipImage, borderwidth=0, padx=0, pady=0,
+        Button(self, image=loadAsset('zipImage.png'), borderwidth=0, padx=0, pady=0,
                highlightthickness=0, command=self.selectZip).place(x=28, y=478)
-        Button(self, image=self.spotifyImage, borderwidth=0, padx=0, pady=0,
+        Button(self, image=loadAsset('spotifyImage.png'), borderwidth=0, padx=0, pady=0,
                highlightthickness=0, command=self.spotifyWeb).place(x=420, y=478)
 
         # Instructions to download spotify data
@@ -355,8 +1781,7 @@ class StartScreen(Frame):
         Label(self, text=guideText, bg='black', fg='white', font=('', 25), justify=LEFT).place(x=0, y=180)
 
         # Cat :D
-        self.logoCat = PhotoImage(file="Assets/logo.png")
-        Label(self, image=self.logoCat, bg='black').place(x=480, y=0)
+        Label(self, image=loadAsset('logo.png'), bg='black').place(x=480, y=0)
 
     @staticmethod
     def spotifyWeb():
@@ -390,11 +1815,8 @@ class PasswordScreen(Frame):
         self['bg'] = 'black'
 
         # Logo Images
-        self.logoText = PhotoImage(file="Assets/logoWhite.png")
-        Label(self, image=self.logoText, bg='black').place(x=0, y=0)
-
-        self.logoCat = PhotoImage(file="Assets/logo.png")
-        Label(self, image=self.logoCat, bg='black').place(x=480, y=0)
+        Label(self, image=loadAsset('logoWhite.png'), bg='black').place(x=0, y=0)
+        Label(self, image=loadAsset('logo.png'), bg='black').place(x=480, y=0)
 
         if encrypted:
             # The database has already been encrypted
@@ -410,9 +1832,15 @@ class PasswordScreen(Frame):
         self.passwordBox = Entry(self, bg='grey20', show='*', font=('', 22), width=34)
         self.passwordBox.place(x=100, y=350)
 
+        # Shown when the database can't be opened
+        self.errorLabel = Label(self, bg='black', fg='red', font=('', 25))
+        self.errorLabel.place(x=400, y=400, anchor='n')
+
     # Decrypts the database and formats data
     def openDB(self):
-        global dbKey, listeningData, topArtists, topSongs
+        global dbKey, listeningData, listeningRollups, listeningAnalytics, searchIndex, similarityGraph, enrichmentState
+        global topArtists, topSongs
+        from cryptography.fernet import Fernet, InvalidToken
 
         # Get the user's password input
         dbPassword = self.passwordBox.get().encode('utf-8')
@@ -423,68 +1851,68 @@ class PasswordScreen(Frame):
 
         # If the data has been encrypted already
         if self.encrypted:
-            # Read file as bytes
-            with open('ListeningDB.json', 'rb') as file:
-                try:
-                    # Decrypt the encrypted data
-                    plainText = crypto.decrypt(file.read())
-                except InvalidToken:
-                    Label(self, text='Incorrect Password', bg='black', fg='red', font=('', 25)).place(x=280, y=400)
-                    return
+            try:
+                # Decrypt the encrypted data
+                listeningData = loadDatabase(crypto)
+            except InvalidToken:
+                updateLabel(self.errorLabel, text='Incorrect Password')
+                return
+            except ValueError:
+                # The file is damaged or was saved by a newer version of FunnyTunes
+                updateLabel(self.errorLabel, text="The database can't be read")
+                return
+
+            # Convert databases saved before the binary format, only removing the old file once the new one is saved
+            if not os.path.isfile(DB_FILE):
+                saveDatabase(crypto, listeningData)
+                os.remove(LEGACY_DB_FILE)
+
+            # Load the period rollups and analytics if they were saved with the database
+            listeningRollups = loadRollups(crypto)
+            listeningAnalytics = loadAnalytics(crypto)
+
+            # Resume background enrichment from where it was when the program was last closed
+            enrichmentState = loadEncrypted(crypto, 'Enrichment.json') or enrichmentState
         else:
-            # Format the extracted database
-            plainText = formatDB()
-            encryptedData = crypto.encrypt(plainText)
-
-            # Open file as bytes to write encrypted data
-            with open('ListeningDB.json', 'wb') as file:
-                file.write(encryptedData)
-
-        # Load database as a dictionary
-        listeningData = json.loads(plainText)
-
-        # The amount of songs saved
-        songAmount = len([listeningData[artist]['tracks'] for artist in listeningData.keys()])
-
-        # Temporarily fill lists with junk data to be replaced
-        topArtists = [_ for _ in range(50)]
-        topSongs = [(_, _) for _ in range(songAmount)]
-
-        # Top artists
-        for index in range(50):
-            runningHighest = 0
-            for artist in listeningData:
-                # The total time spent listening to the artist in milliseconds
-                totalListening = listeningData[artist]['totalListening']
-
-                # If this artist is not yet saved, set it to the next top artist
-                if totalListening > runningHighest and artist not in topArtists:
-                    runningHighest = totalListening
-
-                    # Take the place of the last top artist
-                    topArtists[index] = artist
-
-        # Find the top songs
-        for index in range(songAmount):
-            runningHighest = 0
-            for artist in listeningData:
-                songs = listeningData[artist]['tracks']
-                for song in songs:
-                    # The amount of times a song has been listened to
-                    songListening = songs[song]['listens']
-
-                    # If this song is not yet saved, set it to the next top song
-                    if songListening > runningHighest and (song, artist) not in topSongs:
-                        runningHighest = songListening
-
-                        # Take the place of the last top song
-                        topSongs[index] = (song, artist)
+            # Format the extracted database and save it encrypted
+            listeningData = formatDB()
+            saveDatabase(crypto, listeningData)
+
+            # Save the period rollups and analytics built by formatDB
+            saveBinary(crypto, ROLLUPS_FILE, encodeRollups(listeningRollups))
+            saveBinary(crypto, ANALYTICS_FILE, encodeAnalytics(listeningAnalytics))
+
+            # A new database starts background enrichment from the beginning
+            saveEncrypted(crypto, 'Enrichment.json', enrichmentState)
+
+        # Remove temporary files left by artwork downloads that were interrupted when the program closed
+        if os.path.isdir('Images/Artwork'):
+            for fileName in os.listdir('Images/Artwork'):
+                if fileName.endswith('.part'):
+                    os.remove(f'Images/Artwork/{fileName}')
+
+        # Images saved before the artwork store existed are moved into it, before albums are indexed
+        # as songs with interrupted downloads lose their album
+        if os.path.isdir('Images/Artists'):
+            os.makedirs('Images/Artwork', exist_ok=True)
+            migrateArtwork()
+
+        # Index artists, tracks and albums for searching
+        searchIndex = SearchIndex()
+
+        # Graph of similar artists for recommendations
+        similarityGraph = SimilarityGraph()
+
+        # Top artists and songs
+        topArtists, topSongs = rankListening()
+
+        loadArtworkStore()
 
         # If images have not yet been downloaded (existence validation)
         if not os.path.isdir('Images'):
             # Create the image folders
             os.mkdir('Images')
-            os.mkdir('Images/Artists')
+            os.mkdir('Images/Artwork')
 
             # Download artist profile images and data
             for artist in topArtists[:6]:
@@ -498,8 +1926,11 @@ class PasswordScreen(Frame):
         # Start the download thread
         threading.Thread(target=downloadData, daemon=True).start()
 
+        # Fetch the rest of the library in the background, separately from the downloads for what is on screen
+        threading.Thread(target=enrichLibrary, name='Enrichment', daemon=True).start()
+
         # Display main screen
-        self.main.showFrame(MainScreen(self.window, self.main))
+        self.main.openScreen(MainScreen)
 
 
 class MainScreen(Frame):
@@ -509,15 +1940,21 @@ class MainScreen(Frame):
         # Declare class variables
         self.window = window
         self.main = main
-        self.active = True
+        self.refreshJob = None
+        self.ticks = 0
         self.topGenres = []
-        self.loadedImages = []
-        self.placeHolders = []
+        self.toDownload = []
+
+        # The period the top artists and songs are shown for
+        self.periods = rollupPeriods()
+        self.period = 'All Time'
+        self.currentPeriod = None
+        self.shownArtists = []
+        self.shownSongs = []
 
         # Grey background
         self['bg'] = 'black'
-        self.mainBG = PhotoImage(file="Assets/mainBG.png")
-        Label(self, image=self.mainBG, bg='black').place(x=0, y=0)
+        Label(self, image=loadAsset('mainBG.png'), bg='black').place(x=0, y=0)
 
         # Top labels
         Label(self, text="Top Artists:", bg='black', fg='white', font=('', 17)).place(x=19, y=10)
@@ -529,112 +1966,240 @@ class MainScreen(Frame):
             Label(self, text=number + 1, bg='grey9', fg='white', font=('', 18)).place(x=32, y=310 + 59 * number)
 
         # "View All" button
-        self.viewAllImg = PhotoImage(file="Assets/viewAll.png")
         Button(self, borderwidth=0, highlightthickness=0, command=lambda: self.viewAll(ArtistScreen),
-               image=self.viewAllImg, padx=0, pady=0).place(x=695, y=20)
+               image=loadAsset('viewAll.png'), padx=0, pady=0).place(x=695, y=20)
+
+        # Recommendations button
+        Button(self, text='Discover', bg='grey9', fg='white', font=('', 13), borderwidth=0, highlightthickness=0,
+               command=lambda: self.viewAll(DiscoverScreen)).place(x=690, y=255)
+
+        # Listening habits button, only shown if the database has analytics
+        if listeningAnalytics:
+            Button(self, text='Habits', bg='grey9', fg='white', font=('', 13), borderwidth=0, highlightthickness=0,
+                   command=lambda: self.viewAll(HabitsScreen)).place(x=610, y=255)
+
+        # Period selection, only shown if the database has timestamps to group listens by
+        if len(self.periods) > 1:
+            self.periodChoice = StringVar(self, self.period)
+            periodMenu = OptionMenu(self, self.periodChoice, *self.periods, command=self.setPeriod)
+            periodMenu.config(bg='grey9', fg='white', font=('', 13), borderwidth=0, highlightthickness=0, width=11)
+            periodMenu.place(x=540, y=22)
+
+        # Images and names of the top four artists, updated in place by refresh
+        self.artistPics = []
+        self.artistNames = []
+        for index in range(4):
+            artistPic = Label(self, bg='black')
+            artistPic.place(x=(185 * index) + 50, y=70)
+
+            nameLabel = Label(self, bg='grey9', fg='white', width=16, font=('', 13), justify=CENTER)
+            nameLabel.place(x=(185 * index) + 40, y=210)
+
+            self.artistPics.append(artistPic)
+            self.artistNames.append(nameLabel)
+
+        # Covers, titles, artists and albums of the top three songs
+        self.songCovers = []
+        self.songTitles = []
+        self.songArtists = []
+        self.songAlbums = []
+        for index in range(3):
+            songCover = Label(self, bg='black')
+            songCover.place(x=55, y=(59 * index) + 298)
+
+            songTitle = Label(self, bg='grey9', fg='white', width=16, font=('', 15), anchor='w')
+            songTitle.place(x=120, y=(59 * index) + 302)
+
+            artistTitle = Label(self, bg='grey9', fg='white', width=16, font=('', 13), anchor='w')
+            artistTitle.place(x=120, y=(59 * index) + 325)
+
+            albumLabel = Label(self, bg='grey9', fg='white', width=55, font=('', 13), anchor='e')
+            albumLabel.place(x=270, y=(59 * index) + 320)
+
+            self.songCovers.append(songCover)
+            self.songTitles.append(songTitle)
+            self.songArtists.append(artistTitle)
+            self.songAlbums.append(albumLabel)
 
         # Top genres
         self.genreLabel = Label(self, bg='grey9', fg='white', font=('', 20))
         self.genreLabel.place(x=25, y=545)
 
-        # Begin loading images and genres thread
-        threading.Thread(target=self.ImageLoading, daemon=True).start()
-        threading.Thread(target=self.loadGenres, daemon=True).start()
+        # How much of the library has been enriched with data from LastFM
+        self.coverageLabel = Label(self, bg='black', fg='grey60', font=('', 11))
+        self.coverageLabel.place(x=470, y=497)
+
+        # Search box, results are shown in a list below it as the user types
+        self.searchBox = Entry(self, bg='grey20', fg='white', font=('', 15), width=22)
+        self.searchBox.place(x=170, y=18)
+        self.searchBox.bind('<KeyRelease>', self.updateSearch)
+
+        self.searchList = Listbox(self, bg='grey9', fg='white', font=('', 13), width=45, height=10,
+                                  borderwidth=0, highlightthickness=0)
+        self.searchList.bind('<<ListboxSelect>>', self.openSearchResult)
+        self.searchResults = []
+
+    # Begins updating the screen each time it is shown
+    def start(self):
+        self.refresh()
+
+    # Stops updating the screen when another screen is shown
+    def stop(self):
+        if self.refreshJob:
+            self.after_cancel(self.refreshJob)
+            self.refreshJob = None
 
     # Display the screen to view all artists
     def viewAll(self, screen):
-        self.active = False
-        self.main.showFrame(screen(self.window, self.main))
-
-    def ImageLoading(self):
-        # Continue until all artists have their image displayed
-        while len(self.loadedImages) != 8:
-            # For the top five artists
-            for index, artist in enumerate(topArtists[:4]):
-                imageObject = loadArtist(self.loadedImages, self.placeHolders, artist, 125)
-                if imageObject:
-                    # Display image
-                    artistPic = Label(self, image=imageObject, bg='black')
-                    artistPic.image = imageObject
-                    artistPic.place(x=(185 * index) + 50, y=70)
-
-                    # Display name
-                    nameLabel = Label(self, text=artist, bg='grey9', fg='white', width=16,
-                                      font=('', 13), justify=CENTER)
-                    nameLabel.place(x=(185 * index) + 40, y=210)
-
-            # For the top four songs
-            for index, data in enumerate(topSongs[:3]):
-                song, artist = data
+        self.main.openScreen(screen)
+
+    # Shows the artists, songs and albums matching the search box
+    def updateSearch(self, event):
+        results = searchIndex.search(self.searchBox.get())
+
+        # Each row's artist, so the artist's page can be opened when it is clicked
+        self.searchResults = []
+        self.searchList.delete(0, END)
+
+        for artist in results['artists']:
+            self.searchList.insert(END, f'Artist: {artist}')
+            self.searchResults.append(artist)
+
+        for song, artist in results['tracks']:
+            self.searchList.insert(END, f'Song: {song} - {artist}')
+            self.searchResults.append(artist)
+
+        for album, artist in results['albums']:
+            self.searchList.insert(END, f'Album: {album} - {artist}')
+            self.searchResults.append(artist)
+
+        # Only display the results list if there is something to show
+        if self.searchResults:
+            self.searchList.place(x=170, y=50)
+            self.searchList.lift()
+        else:
+            self.searchList.place_forget()
+
+    # Opens the page of the artist of the selected search result
+    def openSearchResult(self, event):
+        selection = self.searchList.curselection()
+        if not selection:
+            return
+
+        artist = self.searchResults[selection[0]]
+        self.searchList.place_forget()
+        self.main.openScreen(ArtistScreen, topArtists.index(artist) // 3)
+
+    # Switches the top artists and songs to a different period
+    def setPeriod(self, period):
+        self.period = period
+
+    # The top four artists and top three songs within the selected period
+    def periodTops(self):
+        if self.period == 'All Time':
+            return topArtists[:4], topSongs[:3]
+
+        period = self.periods[self.period]
+        return topArtistsInPeriod(period, 4), topSongsInPeriod(period, 3)
+
+    # Queues the images of the shown artists and songs that haven't been downloaded yet
+    def queueDownloads(self):
+        for artist in self.shownArtists:
+            # Artists outside of the saved database only need their image downloaded
+            if not artistArtwork(artist) and artist not in self.toDownload and artist not in topArtists[:6]:
+                downloadQueue.append((getArtistImage, [artist]))
+                self.toDownload.append(artist)
+
+        for song, artist in self.shownSongs:
+            songInfo = listeningData.get(artist, {}).get('tracks', {}).get(song, {})
+
+            # Download the song's image if it is saved in the database but hasn't been downloaded yet
+            if songInfo and 'album' not in songInfo and (song, artist) not in self.toDownload \
+                    and (song, artist) not in topSongs[:3]:
+                downloadQueue.append((getSongImage, [(song, artist)]))
+                self.toDownload.append((song, artist))
+
+    # Updates every widget in one pass ten times a second, only changing the ones that are different
+    def refresh(self):
+        # If a new period has been selected, find its top artists and songs
+        if self.period != self.currentPeriod:
+            self.currentPeriod = self.period
+            self.shownArtists, self.shownSongs = self.periodTops()
+            self.queueDownloads()
+
+        # For the top four artists
+        for index in range(4):
+            if index < len(self.shownArtists):
+                artist = self.shownArtists[index]
+                image = loadImage(artistArtwork(artist), 125)
+            else:
+                # Periods with less than four artists leave the remaining slots empty
+                artist = ''
+                image = loadBlank(125)
+
+            updateLabel(self.artistPics[index], image=image)
+            updateLabel(self.artistNames[index], text=artist)
+
+        # For the top three songs
+        for index in range(3):
+            if index < len(self.shownSongs):
+                song, artist = self.shownSongs[index]
 
                 # For each song, the songInfo includes the amount of times listened, the file path and the album name
-                songInfo = listeningData[artist]['tracks'][song]
-                safeArtistName = regex.sub(r'[\\/*?:"<>.|]', '_', artist)
-
-                # If the song's image has been downloaded
-                if 'file' in songInfo:
-                    # Replace forbidden file characters with an underscore
-                    fileName = songInfo['file']
-                    albumTitle = songInfo['album']
-                # Use blank strings to load a placeholder instead
-                else:
-                    fileName = ''
-                    albumTitle = ''
-
-                artistImage = f'Images/Artists/{safeArtistName}/{fileName}'
-
-                # If the image is not yet loaded
-                if artistImage not in self.loadedImages:
-                    imageObject = loadImage(self.loadedImages, self.placeHolders, artistImage, song, 50)
-                    if imageObject:
-                        # Display image
-                        songCover = Label(self, image=imageObject, bg='black')
-                        songCover.image = imageObject
-                        songCover.place(x=55, y=(59 * index) + 298)
-
-                        # Display song title
-                        songTitle = Label(self, text=song, bg='grey9', fg='white', width=16,
-                                          font=('', 15), anchor='w')
-                        songTitle.place(x=120, y=(59 * index) + 302)
-
-                        # Display artist name
-                        artistTitle = Label(self, text=artist, bg='grey9', fg='white', width=16,
-                                            font=('', 13), anchor='w')
-                        artistTitle.place(x=120, y=(59 * index) + 325)
-
-                        # Display album name
-                        albumLabel = Label(self, text=albumTitle, bg='grey9', fg='white', width=55,
-                                           font=('', 13), anchor='e')
-                        albumLabel.place(x=270, y=(59 * index) + 320)
+                # Songs by artists outside of the saved database have no info and always use a placeholder
+                songInfo = listeningData.get(artist, {}).get('tracks', {}).get(song, {})
+
+                # A blank path and album are used to load a placeholder until the song's info has been downloaded
+                image = loadImage(songArtwork(songInfo, song, artist), 50)
+                albumTitle = songInfo.get('album', '')
+            else:
+                song = artist = albumTitle = ''
+                image = loadBlank(50)
+
+            updateLabel(self.songCovers[index], image=image)
+            updateLabel(self.songTitles[index], text=song)
+            updateLabel(self.songArtists[index], text=artist)
+            updateLabel(self.songAlbums[index], text=albumTitle)
+
+        # Genres and enrichment progress change slowly, so they are only updated once a second
+        if self.ticks % 10 == 0:
+            self.loadGenres()
+        self.ticks += 1
+
+        self.refreshJob = self.after(100, self.refresh)
 
     # Updates the top genres label as artist's genres are downloaded
     def loadGenres(self):
-        while self.active:
-            self.topGenres = []
-
-            # Adds all the genres in a list, with duplicates to be sorted
-            for artist in listeningData:
-                if 'tags' in listeningData[artist]:
-                    for genre in listeningData[artist]['tags']:
-                        self.topGenres.append(genre)
-
-            # Sort the top genres by most occurences
-            sortedTopGenres = sorted(self.topGenres, key=self.topGenres.count, reverse=True)
-
-            # Add the top five genres to a new list
-            topTenGenres = []
-            for genre in sortedTopGenres:
-                # If five genres have already been added, break the loop
-                if len(topTenGenres) == 8:
-                    break
+        self.topGenres = []
+
+        # Adds all the genres in a list, with duplicates to be sorted
+        for artist in listeningData:
+            if 'tags' in listeningData[artist]:
+                for genre in listeningData[artist]['tags']:
+                    self.topGenres.append(genre)
+
+        # Sort the top genres by most occurences
+        sortedTopGenres = sorted(self.topGenres, key=self.topGenres.count, reverse=True)
 
-                # If the genre has not been saved, add it
-                if genre not in topTenGenres:
-                    topTenGenres.append(genre)
+        # Add the top five genres to a new list
+        topTenGenres = []
+        for genre in sortedTopGenres:
+            # If five genres have already been added, break the loop
+            if len(topTenGenres) == 8:
+                break
 
-            # Top five genres as a string seperated by a comma
-            strTopGenres = ', '.join(topTenGenres)
-            self.genreLabel['text'] = strTopGenres
+            # If the genre has not been saved, add it
+            if genre not in topTenGenres:
+                topTenGenres.append(genre)
+
+        # Top five genres as a string seperated by a comma
+        strTopGenres = ', '.join(topTenGenres)
+        updateLabel(self.genreLabel, text=strTopGenres)
+
+        # Background enrichment progress
+        coverage = enrichmentCoverage()
+        updateLabel(self.coverageLabel, text=f'Genres {coverage["tags"]}%  Similar {coverage["similar"]}%  '
+                                             f'Images {coverage["images"]}%')
 
 
 # Tkinter is poorly optomised so this screen lags a bit on macbooks
@@ -646,30 +2211,29 @@ class ArtistScreen(Frame):
         self.window = window
         self.main = main
         self.pageNum = 0
-        self.active = True
+        self.currentPage = None
+        self.pageArtists = []
+        self.toDownload = []
+        self.refreshJob = None
 
         # Grey background
         self['bg'] = 'black'
 
-        # Button images
-        self.backImg = PhotoImage(file="Assets/back.png")
-        self.previousImg = PhotoImage(file="Assets/previous.png")
-        self.nextImg = PhotoImage(file="Assets/next.png")
-
         # Next and previous buttons
-        self.previous = Button(self, image=self.previousImg, bg='black', command=self.previousPage, borderwidth=0,
+        self.previous = Button(self, image=loadAsset('previous.png'), bg='black', command=self.previousPage, borderwidth=0,
                                highlightthickness=0, state='disabled', padx=0, pady=0)
         self.previous.place(x=150, y=540)
 
-        self.next = Button(self, image=self.nextImg, bg='black', command=self.nextPage, borderwidth=0, padx=0, pady=0,
+        self.next = Button(self, image=loadAsset('next.png'), bg='black', command=self.nextPage, borderwidth=0, padx=0, pady=0,
                            highlightthickness=0)
         self.next.place(x=460, y=540)
 
         # Back button
-        Button(self, image=self.backImg, bg='black', command=self.back, borderwidth=0, padx=0, pady=0,
+        Button(self, image=loadAsset('back.png'), bg='black', command=self.back, borderwidth=0, padx=0, pady=0,
                highlightthickness=0).place(x=20, y=10)
 
-        # Artist text
+        # Artist images and text
+        self.artistPics = []
         self.artistNames = []
         self.artistGenres = []
         self.totalListening = []
@@ -678,6 +2242,9 @@ class ArtistScreen(Frame):
 
         # Create labels for each artist
         for index in range(3):
+            artistPic = Label(self, bg='black')
+            artistPic.place(x=30, y=(170 * index) + 50)
+
             artistName = Label(self, bg='black', fg='white', font=('', 22))
             artistName.place(x=180, y=(170 * index) + 45)
 
@@ -694,134 +2261,121 @@ class ArtistScreen(Frame):
             relatedArtists.place(x=180, y=(170 * index) + 170)
 
             # Add the window elements to a list so they can be updated easily
+            self.artistPics.append(artistPic)
             self.artistNames.append(artistName)
             self.artistGenres.append(artistGenre)
             self.totalListening.append(totalListening)
             self.mostPlayed.append(mostPlayed)
             self.relatedArtists.append(relatedArtists)
 
-        # Begin loading the images in another thread
-        threading.Thread(target=self.ArtistLoading, daemon=True).start()
-
-    def ArtistLoading(self):
-        # Declare variables
-        loadedImages = []
-        placeHolders = []
-        toDownload = []
-        currentPage = -1
-
-        # Stop once the back button has been clicked
-        while self.active:
-            if self.pageNum != currentPage or len(loadedImages) != 3:
-                # If a new page is being loaded
-                if self.pageNum != currentPage:
-                    loadedImages = []
-                    placeHolders = []
-
-                # Enable/Disable button interaction
-                if self.pageNum == 0:
-                    self.previous['state'] = 'disabled'
-                elif self.pageNum == 15:
-                    self.next['state'] = 'disabled'
-                else:
-                    self.previous['state'] = 'normal'
-                    self.next['state'] = 'normal'
-
-                dbIndex = 3 * self.pageNum
-                currentPage = self.pageNum
-
-                # Iterates over the three artists to be displayed
-                for index, artist in enumerate(topArtists[dbIndex:dbIndex + 3]):
-                    if artist not in loadedImages:
-                        safeArtistName = regex.sub(r'[\\/*?:"<>.|]', '_', artist)
-
-                        # Download artist's image if it has not been downloaded already (existence validation)
-                        if not os.path.isfile(f'Images/Artists/{safeArtistName}/{safeArtistName}.jpg'):
-                            if artist not in toDownload:
-                                # The the artist's image and data to the download queue
-                                downloadQueue.append((getArtistData, [artist]))
-                                downloadQueue.append((getArtistImage, [artist]))
-                                toDownload.append(artist)
-
-                        imageObject = loadArtist(loadedImages, placeHolders, artist, 140)
-                        if imageObject:
-                            # Display image
-                            artistPic = Label(self, image=imageObject, bg='black')
-                            artistPic.image = imageObject
-                            artistPic.place(x=30, y=(170 * index) + 50)
-
-                        # Artist text
-                        self.artistNames[index]['text'] = artist
-
-                        # Convert ms to hrs
-                        listening = int(listeningData[artist]['totalListening'] / 3600000)
-                        self.totalListening[index]['text'] = f'Total Listening: {listening}hrs'
-
-                        # Artist genres
-                        characterTotal = 0
-                        if 'tags' in listeningData[artist]:
-                            # A list of the artists genres
-                            tags = listeningData[artist]['tags']
-
-                            # Avoid text being longer than the window
-                            for tag in tags:
-                                characterTotal += len(tag)
-
-                                # Text can't exceed 39 characters (range validation)
-                                if characterTotal > 39:
-                                    tags.remove(tag)
-
-                            # Update GUI text
-                            self.artistGenres[index]['text'] = f'Genres: {", ".join(tags)}'
-                        else:
-                            self.artistGenres[index]['text'] = ''
+    # Begins updating the screen each time it is shown, search results can open any page
+    def start(self, pageNum=0):
+        self.pageNum = pageNum
+        self.currentPage = None
+        self.refresh()
+
+    # Stops updating the screen when another screen is shown
+    def stop(self):
+        if self.refreshJob:
+            self.after_cancel(self.refreshJob)
+            self.refreshJob = None
+
+    # Updates the text that only changes when a new page is shown
+    def showPage(self):
+        # Enable/Disable button interaction, search results can open any page so both buttons are set
+        if self.pageNum == 0:
+            self.previous['state'] = 'disabled'
+            self.next['state'] = 'normal'
+        elif self.pageNum >= 15:
+            self.previous['state'] = 'normal'
+            self.next['state'] = 'disabled'
+        else:
+            self.previous['state'] = 'normal'
+            self.next['state'] = 'normal'
 
-                        # Garbage data
-                        artistTracks = ['' for _ in range(3)]
+        dbIndex = 3 * self.pageNum
+        self.pageArtists = topArtists[dbIndex:dbIndex + 3]
 
-                        # The artist's top three most played songs
-                        for songIndex in range(3):
-                            runningHighest = 0
-                            for track in listeningData[artist]['tracks']:
-                                # The amount of times a song has been played
-                                listens = listeningData[artist]['tracks'][track]['listens']
+        # Iterates over the three artists to be displayed
+        for index in range(3):
+            # The last page may have less than three artists
+            if index >= len(self.pageArtists):
+                for label in (self.artistNames, self.totalListening, self.mostPlayed):
+                    updateLabel(label[index], text='')
+                continue
 
-                                # If this artist is not yet saved, set it to the next top artist
-                                if listens > runningHighest and track not in artistTracks:
-                                    runningHighest = listens
+            artist = self.pageArtists[index]
 
-                                    # Take the place of the last top artist
-                                    artistTracks[songIndex] = track
+            # Download artist's image if it has not been downloaded already (existence validation)
+            if not artistArtwork(artist) and artist not in self.toDownload:
+                # The the artist's image and data to the download queue
+                downloadQueue.append((getArtistData, [artist]))
+                downloadQueue.append((getArtistImage, [artist]))
+                self.toDownload.append(artist)
 
-                        # Avoid text being longer than the window
-                        characterTotal = 0
-                        for track in artistTracks:
-                            characterTotal += len(track)
+            # Artist text
+            updateLabel(self.artistNames[index], text=artist)
 
-                            # Text can't exceed 39 characters (range validation)
-                            if characterTotal > 39:
-                                artistTracks.remove(track)
+            # Convert ms to hrs
+            listening = int(listeningData[artist]['totalListening'] / 3600000)
+            listeningText = f'Total Listening: {listening}hrs'
 
-                        # Update GUI text
-                        self.mostPlayed[index]['text'] = f'Most played songs: {", ".join(artistTracks)}'
+            # How often the artist is skipped
+            skipRate = artistSkipRate(artist)
+            if skipRate is not None:
+                listeningText += f', {skipRate}% skipped'
 
-                        # If related artists have been saved (existence validation)
-                        characterTotal = 0
-                        if 'similar' in listeningData[artist]:
-                            relatedArtists = listeningData[artist]['similar']
+            updateLabel(self.totalListening[index], text=listeningText)
 
-                            # Avoid text being longer than the window
-                            for relatedArtist in relatedArtists:
-                                characterTotal += len(relatedArtist)
+            # The artist's top three most played songs
+            tracks = listeningData[artist]['tracks']
+            artistTracks = heapq.nlargest(3, tracks, key=lambda track: tracks[track]['listens'])
 
-                                # Text can't exceed 39 characters (range validation)
-                                if characterTotal > 39:
-                                    relatedArtists.remove(relatedArtist)
+            # Avoid text being longer than the window
+            artistTracks = fitText(artistTracks)
 
-                            # Update GUI text
-                            self.relatedArtists[index]['text'] = f'Related artists: {", ".join(relatedArtists)}'
-                        else:
-                            self.relatedArtists[index]['text'] = ''
+            # Update GUI text
+            updateLabel(self.mostPlayed[index], text=f'Most played songs: {", ".join(artistTracks)}')
+
+    # Updates every widget in one pass ten times a second, only changing the ones that are different
+    def refresh(self):
+        # If a new page is being loaded
+        if self.pageNum != self.currentPage:
+            self.currentPage = self.pageNum
+            self.showPage()
+
+        # Images, genres and related artists can be downloaded while the page is open
+        for index in range(3):
+            if index >= len(self.pageArtists):
+                updateLabel(self.artistPics[index], image=loadBlank(140))
+                updateLabel(self.artistGenres[index], text='')
+                updateLabel(self.relatedArtists[index], text='')
+                continue
+
+            artist = self.pageArtists[index]
+            updateLabel(self.artistPics[index], image=loadImage(artistArtwork(artist), 140))
+
+            # Artist genres
+            if 'tags' in listeningData[artist]:
+                # A list of the artists genres, shortened to avoid text being longer than the window
+                tags = fitText(listeningData[artist]['tags'])
+
+                # Update GUI text
+                updateLabel(self.artistGenres[index], text=f'Genres: {", ".join(tags)}')
+            else:
+                updateLabel(self.artistGenres[index], text='')
+
+            # If related artists have been saved (existence validation)
+            if listeningData[artist].get('similar'):
+                # The three most similar artists, shortened to avoid text being longer than the window
+                relatedArtists = fitText(listeningData[artist]['similar'][:3])
+
+                # Update GUI text
+                updateLabel(self.relatedArtists[index], text=f'Related artists: {", ".join(relatedArtists)}')
+            else:
+                updateLabel(self.relatedArtists[index], text='')
+
+        self.refreshJob = self.after(100, self.refresh)
 
     def nextPage(self):
         self.pageNum += 1
@@ -831,23 +2385,357 @@ class ArtistScreen(Frame):
 
     # Returns GUI to the main page
     def back(self):
-        self.active = False
-        self.main.showFrame(MainScreen(self.window, self.main))
+        self.main.openScreen(MainScreen)
+
+
+# Artists similar to the user's top ten that they have never listened to, and groups of similar artists in their library
+class DiscoverScreen(Frame):
+    def __init__(self, window, main):
+        Frame.__init__(self, window)
+
+        # Declare class variables
+        self.window = window
+        self.main = main
+        self.shownRecommendations = []
+        self.refreshJob = None
+
+        # Grey background
+        self['bg'] = 'black'
+
+        # Back button
+        Button(self, image=loadAsset('back.png'), bg='black', command=self.back, borderwidth=0, padx=0, pady=0,
+               highlightthickness=0).place(x=20, y=10)
+
+        # Section titles
+        Label(self, text='Recommended Artists:', bg='black', fg='white', font=('', 17)).place(x=70, y=12)
+        Label(self, text='Similar Artists In Your Library:', bg='black', fg='white', font=('', 17)).place(x=19, y=235)
+
+        # Ten recommendations in two columns, clicking one opens its LastFM page
+        self.recommendations = []
+        for index in range(10):
+            recommendation = Label(self, bg='black', fg='white', font=('', 15), anchor='w', cursor='hand2')
+            recommendation.place(x=(380 * (index // 5)) + 40, y=(32 * (index % 5)) + 60)
+            recommendation.bind('<Button-1>', lambda event, index=index: self.openRecommendation(index))
+
+            self.recommendations.append(recommendation)
+
+        # The three largest groups of similar artists
+        self.clusters = []
+        for index in range(3):
+            cluster = Label(self, bg='black', fg='white', font=('', 15), anchor='w')
+            cluster.place(x=40, y=(32 * index) + 280)
+
+            self.clusters.append(cluster)
+
+    # Begins updating the screen each time it is shown
+    def start(self):
+        self.refresh()
+
+    # Stops updating the screen when another screen is shown
+    def stop(self):
+        if self.refreshJob:
+            self.after_cancel(self.refreshJob)
+            self.refreshJob = None
+
+    # Updates the recommendations and groups once a second, as similar artists are downloaded in the background
+    def refresh(self):
+        self.shownRecommendations = recommendArtists()
+
+        for index in range(10):
+            if index < len(self.shownRecommendations):
+                # Long names are shortened so they don't overlap the second column
+                text = f'{index + 1}. {self.shownRecommendations[index][:28]}'
+            elif index == 0:
+                text = 'Downloading similar artists...'
+            else:
+                text = ''
+
+            updateLabel(self.recommendations[index], text=text)
+
+        clusters = libraryClusters()
+
+        for index in range(3):
+            if index < len(clusters):
+                # Avoid text being longer than the window
+                text = f'{", ".join(fitText(clusters[index], 50))} ({len(clusters[index])} artists)'
+            else:
+                text = ''
+
+            updateLabel(self.clusters[index], text=text)
+
+        self.refreshJob = self.after(1000, self.refresh)
+
+    # Opens a recommended artist's LastFM page in the user's browser
+    def openRecommendation(self, index):
+        if index < len(self.shownRecommendations):
+            webbrowser.open(f'https://www.last.fm/music/{self.shownRecommendations[index]}')
+
+    # Returns GUI to the main page
+    def back(self):
+        self.main.openScreen(MainScreen)
+
+
+# Listening sessions, repeat streaks, skipped songs and new artists, from the analytics built with the database
+class HabitsScreen(Frame):
+    def __init__(self, window, main):
+        Frame.__init__(self, window)
+
+        # Declare class variables
+        self.window = window
+        self.main = main
+        self.shown = False
+
+        # Grey background
+        self['bg'] = 'black'
+
+        # Back button
+        Button(self, image=loadAsset('back.png'), bg='black', command=self.back, borderwidth=0, padx=0, pady=0,
+               highlightthickness=0).place(x=20, y=10)
+
+        # Session summary
+        Label(self, text='Listening Sessions:', bg='black', fg='white', font=('', 17)).place(x=70, y=12)
+        self.sessionLabel = Label(self, bg='black', fg='white', font=('', 15))
+        self.sessionLabel.place(x=40, y=50)
+
+        # Listening time in each hour of the week as a heatmap, a row for each day. The cells are coloured by showHabits
+        self.hourChart = Canvas(self, bg='black', width=720, height=130, highlightthickness=0)
+        self.hourChart.place(x=40, y=85)
+        self.hourCells = []
+        for weekday, dayName in enumerate(('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')):
+            self.hourChart.create_text(0, 15 * weekday + 7, text=dayName, fill='white', anchor='w')
+            for hour in range(24):
+                self.hourCells.append(self.hourChart.create_rectangle(40 + 28 * hour, 15 * weekday,
+                                                                      66 + 28 * hour, 15 * weekday + 13,
+                                                                      fill='grey10', width=0))
+
+        # Label every sixth hour
+        for hour in range(0, 24, 6):
+            self.hourChart.create_text(40 + 28 * hour, 120, text=f'{hour:02}:00', fill='white', anchor='w')
+
+        # Four lists of five rows, updated by showHabits
+        self.rows = {}
+        for name, title, x, y in (('streaks', 'Longest Repeat Streaks:', 19, 230),
+                                  ('skipped', 'Most Skipped Songs:', 410, 230),
+                                  ('sessions', 'Longest Sessions:', 19, 410),
+                                  ('discoveries', 'Recent Discoveries:', 410, 410)):
+            Label(self, text=title, bg='black', fg='white', font=('', 17)).place(x=x, y=y)
+
+            self.rows[name] = []
+            for index in range(5):
+                row = Label(self, bg='black', fg='white', font=('', 13), anchor='w')
+                row.place(x=x + 20, y=(29 * index) + y + 35)
+                self.rows[name].append(row)
+
+    # The analytics don't change while the program is open, so they are only shown the first time
+    def start(self):
+        if not self.shown:
+            self.shown = True
+            self.showHabits()
+
+    # Nothing is updated while the screen is shown
+    def stop(self):
+        pass
+
+    # Fills the labels and chart from the analytics
+    def showHabits(self):
+        sessionCount, averageMinutes = sessionSummary()
+        updateLabel(self.sessionLabel, text=f'{sessionCount} sessions, {averageMinutes} minutes long on average. '
+                                            f'Listening time in each hour:')
+
+        # Cells get lighter with listening time, the busiest hour is white
+        hours = listeningByHour()
+        busiestHour = max(hours) or 1
+        for hour, cell in enumerate(self.hourCells):
+            self.hourChart.itemconfig(cell, fill=f'grey{10 + 90 * hours[hour] // busiestHour}')
+
+        # Long titles are shortened so they don't overlap the second column
+        rows = {
+            'streaks': [f'{streak}x {song[:20]} - {artist[:12]}'
+                        for streak, song, artist, firstListen in listeningAnalytics['longestStreaks']],
+            'skipped': [f'{skipRate}% {song[:20]} - {artist[:12]}' for skipRate, song, artist in mostSkippedSongs(5)],
+            'sessions': [f'{firstListen}: {minutes // 60}h {minutes % 60}m, {listens} songs'
+                         for minutes, listens, firstListen in longestSessions(5)],
+            'discoveries': [f'{firstListen}: {artist[:25]}' for firstListen, artist in recentDiscoveries(5)]
+        }
+
+        for name, texts in rows.items():
+            for index, row in enumerate(self.rows[name]):
+                updateLabel(row, text=texts[index] if index < len(texts) else '')
+
+    # Returns GUI to the main page
+    def back(self):
+        self.main.openScreen(MainScreen)
+
+
+# Runs a version of FunnyTunes until its first frame is drawn, then prints the time it was drawn and exits.
+# Replacing mainloop means any version can be measured, including ones from before the benchmark existed.
+FIRST_FRAME_SCRIPT = """
+import runpy, sys, time, tkinter
+
+def firstFrame(window, *args):
+    window.update()
+    print(time.time())
+    sys.exit()
+
+tkinter.Misc.mainloop = firstFrame
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
 
+# The first frame should be drawn in less than this fraction of the baseline's time
+STARTUP_TARGET = 0.75
+
+
+# The median time a version of FunnyTunes takes to draw its first frame, and how long each of its imports took,
+# or None if the program failed before its first frame was drawn (e.g. there is no display)
+def measureStartup(script, runs):
+    import subprocess
+    from statistics import median
+
+    frameTimes = []
+    importTimes = {}
+
+    for _ in range(runs):
+        started = time.time()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', FIRST_FRAME_SCRIPT, script],
+                                capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+        # Lines are formatted as "import time: self [us] | cumulative | imported package",
+        # imports made by other modules are indented so only the program's own imports are kept
+        errors = []
+        for line in result.stderr.splitlines():
+            fields = line.split('|')
+            if not line.startswith('import time:'):
+                errors.append(line)
+            elif fields[1].strip().isdigit() and not fields[2].startswith('  '):
+                importTimes.setdefault(fields[2].strip(), []).append(int(fields[1]) / 1000)
+
+        if result.returncode != 0 or not result.stdout.strip():
+            print(f'{script} failed before drawing its first frame: {errors[-1] if errors else "no output"}')
+            return None, {}
+
+        # The child process prints the time its first frame was drawn
+        frameTimes.append(float(result.stdout.split()[-1]) - started)
+
+    return median(frameTimes), {module: median(times) for module, times in importTimes.items()}
+
+
+# Measures how long the program takes to show its first window and which imports take the longest,
+# compared to an older version of the program if one is given.
+# Run with "python FunnyTunes.py --benchmark [baseline.py]", e.g. after "git show <commit>:FunnyTunes.py > baseline.py"
+def benchmarkStartup(baseline=None, runs=5):
+    frameTime, importTimes = measureStartup(os.path.abspath(__file__), runs)
+    if frameTime is None:
+        return
+
+    print(f'Time to first frame: {frameTime * 1000:.0f}ms (median of {runs} runs)')
+    print('Slowest imports before the first frame:')
+    for module, importTime in sorted(importTimes.items(), key=lambda item: item[1], reverse=True)[:10]:
+        print(f'    {module:<30}{importTime:>8.1f}ms')
+
+    # How long the modules that used to be imported before the first frame take to import
+    import subprocess
+    result = subprocess.run([sys.executable, '-c', 'import time; started = time.perf_counter(); '
+                             'import requests, bs4, cryptography.fernet, PIL.ImageTk; '
+                             'print(time.perf_counter() - started)'], capture_output=True, text=True)
+    if result.returncode == 0:
+        print(f'Imports deferred until after the first frame: {float(result.stdout) * 1000:.0f}ms')
+    else:
+        print(f'Deferred imports could not be measured: {result.stderr.strip().splitlines()[-1]}')
+
+    if not baseline:
+        return
+
+    baselineTime = measureStartup(os.path.abspath(baseline), runs)[0]
+    if baselineTime is None:
+        return
+
+    target = baselineTime * STARTUP_TARGET
+    print(f'Baseline time to first frame: {baselineTime * 1000:.0f}ms, target: under {target * 1000:.0f}ms '
+          f'({"met" if frameTime < target else "not met"})')
+
+
+# Compares the size and load time of the JSON and binary formats using the sample data, including the rollups and
+# analytics saved alongside the database as openDB loads them too.
+# Run with "python FunnyTunes.py --benchmark-db"
+def benchmarkDatabase(runs=5):
+    global listeningData
+    from statistics import median
+    from cryptography.fernet import Fernet
+
+    # Build a database from the sample data
+    with ZipFile('Sample Data.zip', 'r') as file:
+        file.extractall('Spotify Data')
+    data = formatDB()
+    crypto = Fernet(Fernet.generate_key())
+
+    # The arrays in the rollups were saved as lists before the binary format
+    def encryptJSON(item, indent=None):
+        return crypto.encrypt(json.dumps(item, indent=indent, ensure_ascii=False, default=list).encode('utf-8'))
+
+    def encryptBinary(payload):
+        return DB_MAGIC + struct.pack('<B', DB_VERSION) + urlsafe_b64decode(crypto.encrypt(payload))
+
+    def decryptBinary(file):
+        return crypto.decrypt(urlsafe_b64encode(file[len(DB_MAGIC) + 1:]))
+
+    def loadJSONFormat(files):
+        return [json.loads(crypto.decrypt(file)) for file in files]
+
+    def loadBinaryFormat(files):
+        database, rollups, analytics = files
+        return [decodeDatabase(decryptBinary(database)), decodeRollups(decryptBinary(rollups)),
+                decodeAnalytics(decryptBinary(analytics))]
+
+    # How each format saves the database, rollups and analytics
+    formats = (
+        ('JSON', [encryptJSON(data, 4), encryptJSON(listeningRollups), encryptJSON(listeningAnalytics)], loadJSONFormat),
+        ('Binary', [encryptBinary(encodeDatabase(data)), encryptBinary(encodeRollups(listeningRollups)),
+                    encryptBinary(encodeAnalytics(listeningAnalytics))], loadBinaryFormat)
+    )
+
+    print(f'{"Format":<10}{"Database":>12}{"Rollups":>12}{"Analytics":>12}{"Total":>12}{"Open":>12}')
+    for name, files, load in formats:
+        times = []
+        for _ in range(runs):
+            # Everything openDB does with the saved files before the main screen is shown
+            started = time.perf_counter()
+            listeningData = load(files)[0]
+            rankListening()
+            SearchIndex()
+            SimilarityGraph()
+            times.append(time.perf_counter() - started)
+
+        sizes = ''.join(f'{len(file) / 1024:>10.0f}KB' for file in files)
+        print(f'{name:<10}{sizes}{sum(map(len, files)) / 1024:>10.0f}KB{median(times) * 1000:>10.1f}ms')
+
+
+if '--benchmark' in sys.argv:
+    # An older version of FunnyTunes.py can be given to compare against
+    arguments = sys.argv[sys.argv.index('--benchmark') + 1:]
+    benchmarkStartup(arguments[0] if arguments else None)
+    sys.exit()
+
+if '--benchmark-db' in sys.argv:
+    benchmarkDatabase()
+    sys.exit()
 
 # Launch the GUI
 GUI().mainloop()
 
+# The window was closed before a database was opened, so there is nothing to save
+if not dbKey:
+    sys.exit()
+
+from cryptography.fernet import Fernet
+
 # Create cryptography object
 encryptor = Fernet(dbKey)
 
-# Save updated database
-# If the program is forcefully closed, the data may not save properly and can be corrupted
-with open('ListeningDB.json', 'wb') as database:
-    # Convert database from a dictionary to a json object, then encode to bytes
-    jsonData = json.dumps(listeningData, indent=4, ensure_ascii=False)
-    bytesData = jsonData.encode('utf-8')
+# Save updated database, waiting for any data being downloaded to be saved in it
+with databaseLock:
+    saveDatabase(encryptor, listeningData)
 
-    # Encrypt database and write data to file
-    newData = encryptor.encrypt(bytesData)
-    database.write(newData)
\ No newline at end of file
+# Save background enrichment's progress since it last saved
+with enrichmentLock:
+    saveEncrypted(encryptor, 'Enrichment.json', enrichmentState)
\ No newline at end of file